@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Replay stored historical bars through the live signal and exit rules.
+
+Bars are read from <data_dir>/<SYMBOL>_<interval>.csv as written by
+data_provider.py record, or <data_dir>/<SYMBOL>.csv, e.g. a yfinance
+history frame saved with DataFrame.to_csv().
+"""
+
+import argparse
+import heapq
+import os
+import numpy as np
+import pandas as pd
+from config import *
+from indicator_panel import IndicatorPanel, evaluate_signals, NO_SIGNAL
+
+EXIT_TARGET = 1
+EXIT_STOP = 2
+EXIT_REASONS = {EXIT_TARGET: 'TARGET_HIT', EXIT_STOP: 'STOP_LOSS_HIT'}
+
+
+def load_bars(data_dir, symbols=None, interval='5m'):
+    """Load stored OHLCV bars for the configured symbols"""
+    frames = {}
+    for name in symbols or SYMBOLS:
+        path = os.path.join(data_dir, f"{name}_{interval}.csv")
+        if not os.path.exists(path):
+            path = os.path.join(data_dir, f"{name}.csv")
+        if not os.path.exists(path):
+            continue
+        frame = pd.read_csv(path, index_col=0)
+        frame.index = pd.to_datetime(frame.index, utc=True)
+        frames[name] = frame.sort_index()
+    return frames
+
+
+def find_exits(closes, entry_index, direction, target, stop, chunk=256):
+    """Find the first bar after each entry where target or stop is hit
+    
+    All open entries are scanned together, `chunk` bars at a time, so the
+    cost is a handful of array comparisons rather than a loop per bar.
+    Entries that never exit get an exit index of -1.
+    """
+    exit_index = np.full(len(entry_index), -1)
+    exit_reason = np.zeros(len(entry_index), dtype=np.int8)
+    padded = np.concatenate([closes, np.full(chunk, np.nan)])
+    last_column = len(padded) - 1
+    
+    pending = np.arange(len(entry_index))
+    offset = 1
+    while pending.size and offset < len(closes):
+        columns = entry_index[pending, None] + offset + np.arange(chunk)
+        window = padded[np.minimum(columns, last_column)]
+        is_buy = direction[pending, None] > 0
+        entry_target = target[pending, None]
+        entry_stop = stop[pending, None]
+        
+        hit_target = np.where(is_buy, window >= entry_target, window <= entry_target)
+        hit_stop = np.where(is_buy, window <= entry_stop, window >= entry_stop)
+        hit = hit_target | hit_stop
+        
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)[found]
+        rows = pending[found]
+        exit_index[rows] = entry_index[rows] + offset + first
+        exit_reason[rows] = np.where(hit_target[found, first], EXIT_TARGET, EXIT_STOP)
+        
+        pending = pending[~found]
+        offset += chunk
+    return exit_index, exit_reason
+
+
+class Backtester:
+    def __init__(self, frames, volume_window=BAR_CACHE_MAX_BARS):
+        self.panel = IndicatorPanel.from_frames(frames)
+        self.indicators = self.panel.compute(volume_window=volume_window)
+    
+    def candidate_entries(self, rules, cooldown):
+        """Signal bars per symbol that survive the signal cooldown"""
+        cooldown_ns = np.int64(cooldown * 1_000_000_000)
+        timestamps = self.panel.timestamps.astype(np.int64)
+        candidates = []
+        for row in range(len(self.panel.names)):
+            columns = np.flatnonzero(rules[row] != NO_SIGNAL)
+            last_time = None
+            for column in columns:
+                signal_time = timestamps[row, column]
+                if last_time is not None and signal_time - last_time < cooldown_ns:
+                    continue
+                last_time = signal_time
+                candidates.append((signal_time, row, column))
+        candidates.sort()
+        return candidates
+    
+    def run(self, params=None, target_percent=TARGET_PROFIT_PERCENT,
+            stop_percent=STOP_LOSS_PERCENT, max_trades=MAX_TRADES, cooldown=600):
+        """Replay the bars and return the trades and a portfolio summary"""
+        rules, directions = evaluate_signals(self.indicators, params)
+        candidates = self.candidate_entries(rules, cooldown)
+        closes = self.panel.closes
+        timestamps = self.panel.timestamps
+        
+        # Exits only depend on the entry, so resolve them per symbol in bulk
+        columns = {}
+        for signal_time, row, column in candidates:
+            columns.setdefault(row, []).append(column)
+        exits = {}
+        for row, entry_columns in columns.items():
+            entry_index = np.array(entry_columns)
+            direction = directions[row, entry_index].astype(float)
+            entry_price = closes[row, entry_index]
+            target = np.where(direction > 0, entry_price * (1 + target_percent / 100),
+                              entry_price * (1 - target_percent / 100))
+            stop = np.where(direction > 0, entry_price * (1 - stop_percent / 100),
+                            entry_price * (1 + stop_percent / 100))
+            exit_index, exit_reason = find_exits(closes[row], entry_index, direction, target, stop)
+            for position, column in enumerate(entry_columns):
+                exits[(row, column)] = (target[position], stop[position],
+                                        exit_index[position], exit_reason[position])
+        
+        # Apply the trade limit in time order; a cycle runs exits before
+        # confirmations, so a slot freed on a bar is reusable on that bar
+        trades = []
+        open_exits = []
+        for signal_time, row, column in candidates:
+            while open_exits and open_exits[0] <= signal_time:
+                heapq.heappop(open_exits)
+            if len(open_exits) >= max_trades:
+                continue
+            
+            target, stop, exit_column, reason = exits[(row, column)]
+            exit_time = timestamps[row, exit_column] if exit_column >= 0 else None
+            heapq.heappush(open_exits, exit_time.astype(np.int64) if exit_time is not None
+                           else np.iinfo(np.int64).max)
+            trades.append(self.build_trade(row, column, directions[row, column], target, stop,
+                                           exit_column, reason))
+        
+        trades = pd.DataFrame(trades)
+        return {'trades': trades, 'summary': self.summarize(trades)}
+    
+    def build_trade(self, row, column, direction, target, stop, exit_column, reason):
+        """Build a trade record in the same shape as TradeManager's"""
+        name = self.panel.names[row]
+        quantity = SYMBOLS.get(name, {}).get('lot_size', 1)
+        entry_price = self.panel.closes[row, column]
+        trade = {
+            'symbol': name,
+            'type': 'BUY' if direction > 0 else 'SELL',
+            'option_type': 'CALL' if direction > 0 else 'PUT',
+            'entry_price': entry_price,
+            'target_price': target,
+            'stop_loss': stop,
+            'quantity': quantity,
+            'entry_time': pd.Timestamp(self.panel.timestamps[row, column], tz='UTC'),
+            'status': 'ACTIVE',
+            'exit_time': None,
+            'exit_reason': None,
+            'current_price': np.nan,
+            'pnl_percent': 0.0,
+            'pnl_amount': 0.0
+        }
+        if exit_column >= 0:
+            exit_price = self.panel.closes[row, exit_column]
+            pnl_percent = (exit_price - entry_price) / entry_price * 100 * (1 if direction > 0 else -1)
+            trade.update({
+                'status': 'CLOSED',
+                'exit_time': pd.Timestamp(self.panel.timestamps[row, exit_column], tz='UTC'),
+                'exit_reason': EXIT_REASONS[reason],
+                'current_price': exit_price,
+                'pnl_percent': pnl_percent,
+                'pnl_amount': (pnl_percent / 100) * entry_price * quantity
+            })
+        return trade
+    
+    def summarize(self, trades):
+        """Summarize trades the way TradeManager.get_portfolio_summary does"""
+        if trades.empty:
+            return {'active_trades': 0, 'closed_trades': 0, 'total_pnl': 0, 'win_rate': 0}
+        closed = trades[trades['status'] == 'CLOSED']
+        closed_count = len(closed)
+        winning_count = int((closed['pnl_percent'] > 0).sum())
+        return {
+            'active_trades': len(trades) - closed_count,
+            'closed_trades': closed_count,
+            'total_pnl': float(closed['pnl_amount'].sum()),
+            'win_rate': (winning_count / closed_count * 100) if closed_count > 0 else 0
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest Sensexy signals on stored bars')
+    parser.add_argument('data_dir', help='Directory with <SYMBOL>_<interval>.csv or <SYMBOL>.csv bar files')
+    parser.add_argument('--interval', default='5m', help='Bar interval of the recorded files')
+    parser.add_argument('--trades', help='Write the trade list to this CSV file')
+    args = parser.parse_args()
+    
+    frames = load_bars(args.data_dir, interval=args.interval)
+    if not frames:
+        print(f"❌ No bar files found in {args.data_dir}")
+        return
+    
+    result = Backtester(frames).run()
+    summary = result['summary']
+    print(f"Bars: {', '.join(f'{name}={len(frame)}' for name, frame in frames.items())}")
+    print(f"Closed Trades: {summary['closed_trades']}")
+    print(f"Active Trades: {summary['active_trades']}")
+    print(f"Total P&L: ₹{summary['total_pnl']:,.2f}")
+    print(f"Win Rate: {summary['win_rate']:.1f}%")
+    if args.trades:
+        result['trades'].to_csv(args.trades, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import pandas as pd
+from config import *
+
+class BarCache:
+    def __init__(self, max_bars=BAR_CACHE_MAX_BARS, store=None, interval_limits=None):
+        self.max_bars = max_bars
+        # Intervals that keep a different number of bars, e.g. a 1m base feed
+        self.interval_limits = interval_limits or {}
+        self.frames = {}
+        # Optional BarStore that persists closed bars across restarts
+        self.store = store
+        self.warmed = set()
+    
+    def get(self, symbol, interval):
+        """Get cached bars for a symbol and interval"""
+        key = (symbol, interval)
+        if key not in self.warmed:
+            self.warm_start(symbol, interval)
+        return self.frames.get(key)
+    
+    def limit(self, interval):
+        """Most bars kept for an interval"""
+        return self.interval_limits.get(interval, self.max_bars)
+    
+    def warm_start(self, symbol, interval):
+        """Seed the window from stored bars, so only the gap gets fetched"""
+        self.warmed.add((symbol, interval))
+        if self.store is None or (symbol, interval) in self.frames:
+            return
+        try:
+            stored = self.store.tail(symbol, interval, self.limit(interval))
+        except Exception as e:
+            print(f"Error reading stored bars for {symbol}: {e}")
+            return
+        if stored is not None:
+            self.frames[(symbol, interval)] = stored
+    
+    def last_timestamp(self, symbol, interval):
+        """Get timestamp of the most recent cached bar"""
+        data = self.get(symbol, interval)
+        if data is None or data.empty:
+            return None
+        return data.index[-1]
+    
+    def merge(self, symbol, interval, new_data):
+        """Merge freshly fetched bars into the rolling window"""
+        cached = self.get(symbol, interval)
+        if new_data is not None:
+            # A bar Yahoo sent without a close is no bar at all
+            new_data = new_data.dropna(subset=['Close'])
+        if new_data is None or new_data.empty:
+            return cached
+        
+        if cached is None or cached.empty:
+            merged = new_data
+        else:
+            # Fresh bars win over cached ones, the last cached bar may have
+            # still been forming when it was fetched
+            merged = pd.concat([cached, new_data])
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        
+        merged = merged.iloc[-self.limit(interval):]
+        self.frames[(symbol, interval)] = merged
+        if self.store is not None:
+            try:
+                self.store.append(symbol, interval, merged)
+            except Exception as e:
+                print(f"Error storing bars for {symbol}: {e}")
+        return merged
+    
+    def clear(self, symbol=None, interval=None):
+        """Drop cached bars for one symbol or all symbols, optionally of one interval"""
+        if symbol is None:
+            self.frames.clear()
+            return
+        for key in [k for k in self.frames if k[0] == symbol and interval in (None, k[1])]:
+            del self.frames[key]
@@ -0,0 +1,124 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from config import *
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+TIMESTAMP_COLUMN = 'timestamp'
+
+class BarStore:
+    """Append-only columnar bar history on disk, read through memory maps
+    
+    Every symbol and interval has a directory holding one flat binary file
+    per column: int64 nanoseconds since the epoch (UTC) for timestamps and
+    float64 for prices and volume. Appends only ever add to the end of the
+    files, and reads map them and copy out just the rows asked for, so
+    memory use stays the same however long the history gets.
+    
+    Only closed bars are stored: the last bar of a frame may still be
+    forming, so it waits until a newer bar has been seen.
+    """
+    
+    def __init__(self, root=BAR_STORE_DIR, tz='Asia/Kolkata'):
+        self.root = root
+        self.tz = tz
+        self.lengths = {}
+        self.last_timestamps = {}
+    
+    def directory(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.root, safe_symbol, interval)
+    
+    def column_path(self, symbol, interval, column):
+        return os.path.join(self.directory(symbol, interval), f"{column}.bin")
+    
+    def length(self, symbol, interval):
+        """Number of complete bars stored"""
+        key = (symbol, interval)
+        if key not in self.lengths:
+            self.lengths[key] = self.repair(symbol, interval)
+        return self.lengths[key]
+    
+    def repair(self, symbol, interval):
+        """Cut every column back to the rows all of them have
+        
+        A crash mid-append can leave some columns a row (or part of one)
+        longer than others.
+        """
+        paths = [self.column_path(symbol, interval, column)
+                 for column in (TIMESTAMP_COLUMN,) + COLUMNS]
+        if not all(os.path.exists(path) for path in paths):
+            return 0
+        length = min(os.path.getsize(path) // 8 for path in paths)
+        for path in paths:
+            if os.path.getsize(path) != length * 8:
+                with open(path, 'rb+') as f:
+                    f.truncate(length * 8)
+        return length
+    
+    def read_column(self, symbol, interval, column, start, stop):
+        dtype = np.int64 if column == TIMESTAMP_COLUMN else np.float64
+        length = self.length(symbol, interval)
+        mapped = np.memmap(self.column_path(symbol, interval, column), dtype=dtype,
+                           mode='r', shape=(length,))
+        # Copy the slice so the map can be closed straight away
+        values = np.array(mapped[start:stop])
+        del mapped
+        return values
+    
+    def last_timestamp(self, symbol, interval):
+        """Timestamp of the last stored bar, or None"""
+        key = (symbol, interval)
+        if key not in self.last_timestamps:
+            length = self.length(symbol, interval)
+            if not length:
+                return None
+            nanoseconds = self.read_column(symbol, interval, TIMESTAMP_COLUMN, length - 1, length)[0]
+            self.last_timestamps[key] = pd.Timestamp(nanoseconds, tz='UTC').tz_convert(self.tz)
+        return self.last_timestamps[key]
+    
+    def tail(self, symbol, interval, count):
+        """The last `count` stored bars as a DataFrame, or None"""
+        length = self.length(symbol, interval)
+        if not length:
+            return None
+        start = max(length - count, 0)
+        timestamps = self.read_column(symbol, interval, TIMESTAMP_COLUMN, start, length)
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).tz_convert(self.tz)
+        return pd.DataFrame({column: self.read_column(symbol, interval, column, start, length)
+                             for column in COLUMNS}, index=index)
+    
+    def append(self, symbol, interval, data):
+        """Store the closed bars of `data` that are newer than the stored ones"""
+        if data is None or len(data) < 2:
+            return 0
+        closed = data.iloc[:-1]
+        last_timestamp = self.last_timestamp(symbol, interval)
+        if last_timestamp is not None:
+            closed = closed[closed.index > last_timestamp]
+        if closed.empty:
+            return 0
+        
+        os.makedirs(self.directory(symbol, interval), exist_ok=True)
+        index = closed.index
+        if index.tz is None:
+            index = index.tz_localize(self.tz)
+        timestamps = index.tz_convert('UTC').as_unit('ns').asi8
+        columns = [(TIMESTAMP_COLUMN, timestamps.astype(np.int64))]
+        columns += [(column, closed[column].to_numpy(dtype=np.float64)) for column in COLUMNS]
+        length = self.length(symbol, interval)
+        for column, values in columns:
+            with open(self.column_path(symbol, interval, column), 'ab') as f:
+                f.write(values.tobytes())
+        self.lengths[(symbol, interval)] = length + len(closed)
+        self.last_timestamps[(symbol, interval)] = closed.index[-1]
+        return len(closed)
+
+
+def create_bar_store(provider):
+    """Bar store at BAR_STORE_DIR for a provider's live bars, or None"""
+    # Replayed and synthetic bars must never end up in the live history
+    if not BAR_STORE_DIR or not provider.persist_bars:
+        return None
+    return BarStore()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the analysis, trade-management and notification hot paths.
+
+Everything runs on synthetic bars, temporary portfolio files and a local
+notifier, so no network access is needed. Each run is appended to a history
+file and compared with the previous one:
+
+    python benchmark.py [--quick] [--only NAME] [--threshold 20] [--fail-on-regression]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import *
+import market_analyzer
+from data_provider import SyntheticProvider
+from market_analyzer import MarketAnalyzer
+from notifier import TelegramNotifier
+from storage import JsonPortfolioStore, JournalPortfolioStore
+from trade_manager import TradeManager
+from utils import MarketUtils
+
+HISTORY_FILE = 'benchmarks.jsonl'
+
+RESPONSES = [
+    'yes nifty call', 'ok banknifty pe', 'kk', 'go sensex ce', 'confirm nifty50 put',
+    'no thanks', 'what is the price?', 'y bank nifty', 'done sensex', 'hello'
+]
+
+
+def measure(func, repeat=5, number=1, setup=None):
+    """Median and best seconds per call of `func` over `repeat` rounds"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {'median': statistics.median(timings), 'best': min(timings)}
+
+
+@contextmanager
+def synthetic_universe(count):
+    """Temporarily replace the configured symbols with `count` synthetic ones"""
+    original = dict(SYMBOLS)
+    SYMBOLS.clear()
+    for i in range(count):
+        name = f"SYN{i:03d}"
+        SYMBOLS[name] = {'ticker': f"^{name}", 'name': name, 'lot_size': 25, 'strike_step': 50}
+    try:
+        yield SYMBOLS
+    finally:
+        SYMBOLS.clear()
+        SYMBOLS.update(original)
+
+
+@contextmanager
+def analysis_mode(mode):
+    """Temporarily switch the analyzer between stream and panel evaluation"""
+    original = market_analyzer.ANALYSIS_MODE
+    market_analyzer.ANALYSIS_MODE = mode
+    try:
+        yield
+    finally:
+        market_analyzer.ANALYSIS_MODE = original
+
+
+class LocalNotifier(TelegramNotifier):
+    """Notifier that keeps messages in memory and serves scripted replies"""
+
+    def __init__(self):
+        super().__init__('local', 'local')
+        self.sent = []
+        self.replies = []
+
+    def send_message(self, message, parse_mode='HTML'):
+        self.sent.append(message)
+        return True
+
+    def get_updates(self, timeout=0):
+        updates = [{'update_id': i, 'message': {'text': text}} for i, text in enumerate(self.replies)]
+        self.replies = []
+        return updates
+
+
+class OpenMarketUtils(MarketUtils):
+    """Market hours that never close"""
+
+    def is_market_open(self):
+        return True
+
+
+def make_trade(index, symbol):
+    return {
+        'id': f"TRADE_BENCH_{index:05d}",
+        'symbol': symbol,
+        'type': 'BUY' if index % 2 == 0 else 'SELL',
+        'option_type': 'CE' if index % 2 == 0 else 'PE',
+        'strike_price': 20000,
+        # Revalued through Black-Scholes on every price update
+        'expiry': '2035-01-04T15:30:00+05:30',
+        'implied_vol': 0.15,
+        'entry_price': 2500.0,
+        # Far away exits keep the book the same size across rounds
+        'target_price': 40000.0,
+        'stop_loss': 0.0,
+        'lot_size': 25,
+        'quantity': 25,
+        'entry_time': '2024-01-01T09:15:00+05:30',
+        'status': 'ACTIVE',
+        'reason': 'benchmark',
+        'confidence': 'MEDIUM'
+    }
+
+
+def make_closed_trade(index):
+    trade = make_trade(index, 'NIFTY50')
+    pnl = 100.0 if index % 3 else -50.0
+    trade.update({'status': 'CLOSED', 'exit_price': 20040.0, 'exit_reason': 'TARGET_HIT',
+                  'exit_time': '2024-01-01T10:15:00+05:30', 'pnl_amount': pnl,
+                  'pnl_percent': pnl / 5000})
+    return trade
+
+
+def portfolio_with(active=0, closed=0, symbols=('NIFTY50',)):
+    trades = {}
+    for i in range(active):
+        trade = make_trade(i, symbols[i % len(symbols)])
+        trades[trade['id']] = trade
+    closed_trades = [make_closed_trade(i) for i in range(closed)]
+    return {'active_trades': trades, 'closed_trades': closed_trades,
+            'total_pnl': sum(trade['pnl_amount'] for trade in closed_trades)}
+
+
+def seed_store(store, portfolio):
+    """Write a whole portfolio to a store before a benchmark"""
+    # A commit only writes recorded changes, so seed with a snapshot
+    store.snapshot(portfolio)
+
+
+def bench_generate_signal(sizes, repeat):
+    analyzer = MarketAnalyzer(provider=SyntheticProvider(seed=1))
+    symbol_config = next(iter(SYMBOLS.values()))
+    # Through the bar cache, so the frame is the size the bot analyzes
+    data = analyzer.fetch_data(symbol_config['ticker'])
+
+    def run():
+        analyzer.last_signal_time.clear()
+        analyzer.generate_signal(symbol_config, data)
+
+    run()
+    result = measure(run, repeat, number=50)
+    analyzer.fetch_executor.shutdown()
+    analyzer.quote_executor.shutdown()
+    return {'generate_signal': result}
+
+
+def bench_analyze_all_symbols(sizes, repeat):
+    results = {}
+    for mode in ('stream', 'panel'):
+        for count in sizes:
+            with synthetic_universe(count), analysis_mode(mode):
+                analyzer = MarketAnalyzer(provider=SyntheticProvider(seed=1))
+                analyzer.analyze_all_symbols()
+                results[f"analyze_all_symbols[{mode},{count}]"] = measure(
+                    analyzer.analyze_all_symbols, repeat, setup=analyzer.last_signal_time.clear)
+                analyzer.fetch_executor.shutdown()
+                analyzer.quote_executor.shutdown()
+    return results
+
+
+def bench_update_trade_prices(sizes, repeat, workdir):
+    results = {}
+    symbols = list(SYMBOLS)
+    prices = {name: 20010.0 for name in symbols}
+    for count in sizes:
+        store = JournalPortfolioStore(os.path.join(workdir, f"prices_{count}.json"),
+                                      os.path.join(workdir, f"prices_{count}.journal"))
+        seed_store(store, portfolio_with(active=count, symbols=symbols))
+        manager = TradeManager(store=store)
+        results[f"update_trade_prices[{count}]"] = measure(
+            lambda: manager.update_trade_prices(prices), repeat, number=10)
+    return results
+
+
+def bench_portfolio_io(sizes, repeat, workdir):
+    results = {}
+    for backend, store_class in (('json', JsonPortfolioStore), ('journal', JournalPortfolioStore)):
+        for count in sizes:
+            path = os.path.join(workdir, f"{backend}_{count}.json")
+            if store_class is JournalPortfolioStore:
+                store = store_class(path, os.path.join(workdir, f"{backend}_{count}.journal"))
+            else:
+                store = store_class(path)
+            seed_store(store, portfolio_with(active=2, closed=count))
+            manager = TradeManager(store=store)
+
+            def save():
+                manager.store.record('prices', {})
+                manager.save_portfolio()
+
+            results[f"save_portfolio[{backend},{count}]"] = measure(save, repeat, number=10)
+            results[f"load_portfolio[{backend},{count}]"] = measure(manager.load_portfolio, repeat)
+    return results
+
+
+def bench_parse_user_response(sizes, repeat):
+    notifier = LocalNotifier()
+
+    def run():
+        for text in RESPONSES:
+            notifier.parse_user_response(text)
+
+    result = measure(run, repeat, number=200)
+    notifier.close()
+    # Per message rather than per batch of replies
+    return {'parse_user_response': {key: value / len(RESPONSES) for key, value in result.items()}}
+
+
+def bench_analysis_cycle(sizes, repeat, workdir):
+    from main import SensexyBot
+
+    store = JournalPortfolioStore(os.path.join(workdir, 'cycle.json'),
+                                  os.path.join(workdir, 'cycle.journal'))
+    seed_store(store, portfolio_with(active=2, symbols=list(SYMBOLS)))
+    notifier = LocalNotifier()
+    bot = SensexyBot(analyzer=MarketAnalyzer(provider=SyntheticProvider(seed=1)),
+                     trade_manager=TradeManager(store=store),
+                     notifier=notifier,
+                     utils=OpenMarketUtils())
+    # Handle the scripted replies inside the cycle as the polling setup does
+    bot.listener = None
+
+    def setup():
+        bot.analyzer.last_signal_time.clear()
+        notifier.replies = list(RESPONSES[:3])
+
+    setup()
+    bot.run_analysis_cycle()
+    result = measure(bot.run_analysis_cycle, repeat, setup=setup)
+    notifier.close()
+    bot.analyzer.fetch_executor.shutdown()
+    bot.analyzer.quote_executor.shutdown()
+    return {'run_analysis_cycle': result}
+
+
+BENCHMARKS = {
+    'generate_signal': (bench_generate_signal, [1], False),
+    'analyze_all_symbols': (bench_analyze_all_symbols, [3, 30, 100], False),
+    'update_trade_prices': (bench_update_trade_prices, [3, 100, 1000], True),
+    'portfolio_io': (bench_portfolio_io, [100, 1000, 10000], True),
+    'parse_user_response': (bench_parse_user_response, [1], False),
+    'run_analysis_cycle': (bench_analysis_cycle, [1], True)
+}
+
+QUICK_SIZES = {
+    'analyze_all_symbols': [3, 10],
+    'update_trade_prices': [3, 100],
+    'portfolio_io': [100, 1000]
+}
+
+
+def run_benchmarks(names, quick=False, repeat=5):
+    """Run the selected benchmarks and return {case: timings}"""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='sensexy-bench-')
+    try:
+        for name in names:
+            func, sizes, needs_workdir = BENCHMARKS[name]
+            if quick:
+                sizes = QUICK_SIZES.get(name, sizes)
+            print(f"⏱️ {name}...")
+            if needs_workdir:
+                results.update(func(sizes, repeat, workdir))
+            else:
+                results.update(func(sizes, repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, entry):
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+def compare(results, previous, threshold):
+    """Cases whose median got slower than the previous run by more than `threshold` percent"""
+    regressions = []
+    for case, timing in results.items():
+        before = previous.get(case)
+        if not before:
+            continue
+        change = (timing['median'] / before['median'] - 1) * 100
+        if change > threshold:
+            regressions.append((case, before['median'], timing['median'], change))
+    return regressions
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bot hot paths on synthetic data')
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS),
+                        help='Run only this benchmark (repeatable)')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes for a fast check')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--history', default=HISTORY_FILE, help='Results history file')
+    parser.add_argument('--no-save', action='store_true', help="Don't append this run to the history")
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='Slowdown in percent reported as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only or list(BENCHMARKS), args.quick, args.repeat)
+
+    history = load_history(args.history)
+    # Compare against the last comparable run on the same machine
+    previous = next((entry['results'] for entry in reversed(history)
+                     if entry['machine'] == platform.node() and entry['quick'] == args.quick), {})
+
+    print()
+    for case, timing in results.items():
+        line = f"{case:<45} {format_seconds(timing['median']):>10}  (best {format_seconds(timing['best'])})"
+        if case in previous:
+            change = (timing['median'] / previous[case]['median'] - 1) * 100
+            line += f"  {change:+.1f}%"
+        print(line)
+
+    regressions = compare(results, previous, args.threshold)
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} regression(s) over {args.threshold:.0f}%:")
+        for case, before, after, change in regressions:
+            print(f"  {case}: {format_seconds(before)} -> {format_seconds(after)} ({change:+.1f}%)")
+
+    if not args.no_save:
+        append_history(args.history, {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'machine': platform.node(),
+            'python': platform.python_version(),
+            'quick': args.quick,
+            'results': results
+        })
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import threading
+import time
+from config import *
+from metrics import metrics
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a source whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing source until it has had time to recover
+    
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately. Once the backoff has passed a single probe is
+    let through: success closes the circuit, failure opens it again for
+    twice as long, up to `max_backoff`.
+    """
+    
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 base_backoff=CIRCUIT_BASE_BACKOFF, max_backoff=CIRCUIT_MAX_BACKOFF):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.backoff = base_backoff
+        self.open_until = None
+        self.probing = False
+    
+    def allow(self):
+        """Whether a call may go ahead now"""
+        with self.lock:
+            if self.open_until is None:
+                return True
+            if self.probing or time.monotonic() < self.open_until:
+                return False
+            self.probing = True
+            return True
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.backoff = self.base_backoff
+            self.open_until = None
+            self.probing = False
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.open_until is None:
+                    print(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.open_until = time.monotonic() + self.backoff
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self.probing = False
+                metrics.inc('sensexy_circuit_open_total', source=self.name)
+    
+    def call(self, func, *args, is_failure=None, **kwargs):
+        """Call through the breaker, recording the outcome
+        
+        `is_failure` flags results that count as failures although no
+        exception was raised, e.g. the empty frames yfinance returns after
+        logging an error. Such results are still returned.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable, circuit open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Quick operations that don't need the market data stack:
+
+    python cli.py summary [--send]
+    python cli.py test-connection
+    python cli.py close-trade TRADE_ID [--price PRICE]
+
+Nothing here imports pandas or yfinance, so these start in a fraction of
+the bot's startup time. close-trade edits the portfolio files directly;
+stop the bot first, or it will keep its own copy of the trade open.
+"""
+
+import argparse
+import sys
+from config import *
+
+def command_summary(args):
+    from trade_manager import TradeManager
+    manager = TradeManager()
+    stats = manager.get_portfolio_stats()
+    print(f"Active trades:  {stats['active_trades']}")
+    print(f"Closed trades:  {stats['closed_trades']}")
+    print(f"Total P&L:      ₹{stats['total_pnl']:,.2f}")
+    print(f"Win rate:       {stats['win_rate']:.1f}%")
+    for trade in manager.get_active_trades().values():
+        print(f"  {trade['id']}  {trade['symbol']} {trade['option_type']} "
+              f"@ {trade['entry_price']:.2f}  P&L ₹{trade.get('pnl_amount', 0):,.2f}")
+
+    if args.send:
+        from notifier import TelegramNotifier
+        notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+        notifier.send_portfolio_summary(manager.get_portfolio_summary())
+        notifier.close()
+        return report_delivery(notifier)
+    return 0
+
+
+def command_test_connection(args):
+    from notifier import TelegramNotifier
+    print(f"🔧 Testing Sensexy Bot Connection...")
+    print(f"👤 Chat ID: {TELEGRAM_CHAT_ID}")
+    notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+    notifier.send_message("✅ <b>Sensexy connection test</b>\nThe bot can reach this chat.")
+    notifier.close()
+    return report_delivery(notifier)
+
+
+def command_close_trade(args):
+    from trade_manager import TradeManager
+    manager = TradeManager()
+    trade = manager.get_active_trades().get(args.trade_id)
+    if trade is None:
+        print(f"❌ No active trade {args.trade_id}")
+        return 1
+
+    exit_details = None
+    if args.price is not None:
+        # Settle P&L at the given index price first, which may itself hit the target or stop
+        closed = manager.update_trade_prices({trade['symbol']: args.price})
+        if any(closed_trade['id'] == args.trade_id for closed_trade in closed):
+            print(f"✅ {args.trade_id} closed at its target/stop by the new price")
+            return 0
+        # Option trades exit at the premium that index price gives
+        exit_details = {'exit_price': trade['current_price']}
+
+    trade = manager.close_trade(args.trade_id, reason='MANUAL', exit_details=exit_details)
+    print(f"✅ Closed {trade['id']}, P&L ₹{trade.get('pnl_amount', 0):,.2f}")
+    return 0
+
+
+def report_delivery(notifier):
+    if notifier.delivery.sent_count:
+        print("✅ SUCCESS! Check your Telegram for the message.")
+        return 0
+    print("❌ FAILED! The message could not be delivered, check the bot token and chat ID.")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sensexy maintenance commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summary = commands.add_parser('summary', help='Print the portfolio summary')
+    summary.add_argument('--send', action='store_true', help='Also send it to Telegram')
+    summary.set_defaults(func=command_summary)
+
+    test_connection = commands.add_parser('test-connection', help='Send a Telegram test message')
+    test_connection.set_defaults(func=command_test_connection)
+
+    close_trade = commands.add_parser('close-trade', help='Close an active trade manually')
+    close_trade.add_argument('trade_id')
+    close_trade.add_argument('--price', type=float, help='Index price to exit at, defaults to the last seen price')
+    close_trade.set_defaults(func=command_close_trade)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
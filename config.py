@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from instruments import load_instruments
 
 load_dotenv()
 
@@ -7,13 +8,79 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '8531643397:AAHjWOkL71FIFUA0u1rjRX3JTFUL0gYjgOA')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '1225012575')
 
+# Telegram Delivery
+TELEGRAM_CHAT_RATE = 1.0  # messages per second to one chat
+TELEGRAM_GLOBAL_RATE = 30.0  # messages per second across all chats
+TELEGRAM_MAX_RETRIES = 3
+CONFIRMATION_LISTENER = True  # long-poll for replies instead of checking once per cycle
+LONG_POLL_TIMEOUT = 30  # seconds Telegram holds a getUpdates request open
+SIGNAL_TTL = 600  # seconds a signal can be confirmed before its price is stale
+
 # Trading Parameters
 RSI_OVERSOLD = 30
 RSI_OVERBOUGHT = 70
+RSI_BUY_BAND = 40  # RSI below this near support is a moderate BUY
+RSI_SELL_BAND = 60  # RSI above this near resistance is a moderate SELL
+MOMENTUM_THRESHOLD = 0.5  # % move confirming an RSI extreme
+VOLUME_SURGE_FACTOR = 1.5  # volume vs. its mean that counts as a surge
+VOLUME_MOMENTUM_THRESHOLD = 1.0  # % move needed alongside a volume surge
 TARGET_PROFIT_PERCENT = 1.0
 STOP_LOSS_PERCENT = 0.5
 MAX_TRADES = 3
 ANALYSIS_INTERVAL = 300  # 5 minutes in seconds
+BAR_CLOSE_DELAY = 5  # seconds after a bar closes before analysing it
+EXIT_CHECK_INTERVAL = 5  # seconds between stop-loss/target checks on open positions
+QUOTE_DEADLINE = 3  # seconds an exit check waits for quotes
+SUMMARY_MINUTE = 0  # minute past each hour for the portfolio summary
+
+# Portfolio Storage
+PORTFOLIO_BACKEND = 'journal'  # 'journal' append-only events, 'json' full rewrites
+PORTFOLIO_FILE = 'portfolio.json'
+PORTFOLIO_JOURNAL_FILE = 'portfolio.journal'
+SNAPSHOT_INTERVAL = 100  # journal events between full snapshots
+PRICE_PERSIST_INTERVAL = 60  # seconds between saves of open position prices when nothing closes
+
+# Market Data
+BAR_CACHE_MAX_BARS = 375  # 5 sessions of 5 minute bars
+FETCH_WORKERS = 4
+FETCH_DEADLINE = 20  # seconds a cycle waits for market data
+REQUEST_TIMEOUT = 10  # seconds per HTTP request
+BAR_STORE_DIR = 'bars'  # closed bars kept on disk for warm starts, '' to disable
+DATA_PROVIDER = 'yahoo'  # 'yahoo', 'replay' or 'synthetic'
+REPLAY_DATA_DIR = 'data'  # recorded bars, see data_provider.py record
+REPLAY_SPEED = 1.0  # replay clock speed relative to real time
+
+# Data Resilience
+CIRCUIT_FAILURE_THRESHOLD = 3  # consecutive failures before a data source is paused
+CIRCUIT_BASE_BACKOFF = 15  # seconds of the first pause, doubling while probes fail
+CIRCUIT_MAX_BACKOFF = 600
+HEDGE_DELAY = 1.0  # seconds before a slow quote request is raced by a second one
+MAX_QUOTE_AGE = 300  # seconds a last known good price may stand in for a fresh one
+STALE_PRICE_WARNING = 60  # log exit checks made on prices older than this
+
+# Analysis
+BASE_INTERVAL = '1m'  # one feed resampled to every timeframe, '' to fetch 5m bars directly
+BASE_MAX_BARS = 1875  # 5 sessions of 1 minute bars
+TIMEFRAMES = ['5m', '15m', '1h']  # built from the base feed, 5m drives the signals
+HTF_TREND_FILTER = False  # only take signals in the direction of the higher timeframe trend
+HTF_TREND_INTERVAL = '1h'
+HTF_TREND_PERIOD = 20  # moving average that defines the higher timeframe trend
+# 'stream' per-symbol engines, 'panel' vectorized across symbols, 'sharded'
+# panel shards across worker processes for large universes
+ANALYSIS_MODE = 'stream'
+SCAN_WORKERS = os.cpu_count() or 1
+SCAN_SHARD_SIZE = 32  # symbols per worker task
+
+# Options
+OPTION_TARGET_PERCENT = 30.0  # premium gain that takes profit
+OPTION_STOP_PERCENT = 15.0  # premium loss that stops out
+OPTION_EXPIRY_WEEKDAY = 3  # weekly expiry day, Monday = 0, for symbols without their own
+OPTION_MIN_EXPIRY_DAYS = 1  # roll to the next expiry when closer than this
+OPTION_LADDER_STRIKES = 5  # strikes valued each side of the money
+OPTION_LADDER_EXPIRIES = 3  # weekly expiries valued
+RISK_FREE_RATE = 0.065
+VOLATILITY_WINDOW = 75  # bars of realized volatility used as implied volatility
+MIN_IMPLIED_VOL = 0.08  # floor for quiet sessions
 
 # Market Hours (IST)
 MARKET_OPEN_HOUR = 9
@@ -22,27 +89,35 @@ MARKET_CLOSE_HOUR = 15
 MARKET_CLOSE_MINUTE = 30
 
 # Symbols Configuration
+INSTRUMENTS_FILE = os.getenv('INSTRUMENTS_FILE', 'instruments.csv')
 SYMBOLS = {
     'SENSEX': {
         'ticker': '^BSESN',
         'name': 'SENSEX',
         'lot_size': 10,
-        'strike_step': 100
+        'strike_step': 100,
+        'expiry_weekday': 3
     },
     'NIFTY50': {
         'ticker': '^NSEI',
         'name': 'NIFTY50',
         'lot_size': 50,
-        'strike_step': 50
+        'strike_step': 50,
+        'expiry_weekday': 1
     },
     'BANKNIFTY': {
         'ticker': '^NSEBANK',
         'name': 'BANKNIFTY',
         'lot_size': 15,
-        'strike_step': 100
+        'strike_step': 100,
+        'expiry_weekday': 1
     }
 }
 
+# The instruments file, when present, is the whole universe to scan
+if os.path.exists(INSTRUMENTS_FILE):
+    SYMBOLS = load_instruments(INSTRUMENTS_FILE)
+
 # Confirmation Keywords
 CONFIRMATION_KEYWORDS = [
     'yes', 'ok', 'okay', 'kk', 'oo', 'go', 'do it', 'execute',
@@ -63,6 +138,11 @@ SYMBOL_ALIASES = {
     'sensex': 'SENSEX',
     'bse': 'SENSEX'
 }
+# Every instrument can also be named as it is in the instruments file, as
+# a whole word of the reply, unless the name is itself a confirmation word
+for _name in SYMBOLS:
+    if _name.lower() not in CONFIRMATION_KEYWORDS:
+        SYMBOL_ALIASES.setdefault(_name.lower(), _name)
 
 # Option Type Aliases
 OPTION_ALIASES = {
@@ -70,4 +150,14 @@ OPTION_ALIASES = {
     'ce': 'CALL',
     'put': 'PUT',
     'pe': 'PUT'
-}
\ No newline at end of file
+}
+
+# Metrics
+METRICS_PORT = 9108  # local Prometheus endpoint, 0 to disable
+METRICS_FILE = ''  # also write metrics to this file, e.g. for a textfile collector
+METRICS_FILE_INTERVAL = 60  # seconds between metrics file writes
+
+# Profiling
+PROFILE_DIR = 'profiles'  # where on-demand cycle profiles are written
+PROFILE_CYCLES = 3  # cycles captured per profile request
+PROFILE_MAX_CYCLES = 20  # most cycles one request can capture
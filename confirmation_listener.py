@@ -0,0 +1,38 @@
+import threading
+import time
+from config import *
+
+class ConfirmationListener:
+    """Long-polls Telegram for replies and hands confirmations on at once"""
+    
+    def __init__(self, notifier, on_confirmed, poll_timeout=LONG_POLL_TIMEOUT):
+        self.notifier = notifier
+        self.on_confirmed = on_confirmed
+        self.poll_timeout = poll_timeout
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='confirmation-listener', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        # The thread finishes its current long poll and exits
+        self.running = False
+    
+    def run(self):
+        while self.running:
+            try:
+                # Telegram holds the request open until a message arrives,
+                # so an idle chat costs one request per poll_timeout
+                poll_errors = self.notifier.poll_errors
+                confirmed_signals = self.notifier.process_user_responses(self.poll_timeout)
+                for signal in confirmed_signals:
+                    self.on_confirmed(signal)
+                if self.notifier.poll_errors != poll_errors:
+                    # Don't spin against Telegram while it is unreachable
+                    time.sleep(5)
+            except Exception as e:
+                print(f"Error in confirmation listener: {e}")
+                time.sleep(5)
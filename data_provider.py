@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Market data sources the bot reads bars and quotes through.
+
+    python data_provider.py record <data_dir> [--period 60d] [--interval 5m]
+
+saves Yahoo bars for every configured symbol as <data_dir>/<SYMBOL>_<interval>.csv,
+which the replay provider and backtest.py can read back.
+"""
+
+import argparse
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+import pandas as pd
+from config import *
+from circuit_breaker import CircuitBreaker
+
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60}
+# Days back Yahoo serves intraday bars for, a day inside its actual limits
+YAHOO_RETENTION_DAYS = {'1m': 6, '2m': 59, '5m': 59, '15m': 59, '30m': 59, '60m': 729, '1h': 729}
+
+
+def period_days(period):
+    """Number of sessions in a Yahoo style period such as '5d'"""
+    if period.endswith('d'):
+        return int(period[:-1])
+    if period.endswith('mo'):
+        return int(period[:-2]) * 21
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def trim_to_period(data, period):
+    """Keep the bars of the last sessions covered by `period`"""
+    if data.empty:
+        return data
+    sessions = data.index.normalize().unique()
+    first_session = sessions[-min(period_days(period), len(sessions))]
+    return data[data.index >= first_session]
+
+
+def empty_bars(data):
+    return data is None or data.empty
+
+
+def empty_batch(frames):
+    return not frames or all(empty_bars(frame) for frame in frames.values())
+
+
+class MarketDataProvider:
+    """Interface for everything that serves bars and quotes"""
+    
+    # Whether bars from this source belong in the on-disk bar history
+    persist_bars = False
+    
+    def history(self, ticker, period=None, start=None, interval='5m'):
+        """Bars for one ticker over a period or since `start`"""
+        raise NotImplementedError
+    
+    def download(self, tickers, period=None, start=None, interval='5m'):
+        """Bars for several tickers, as a dict of ticker -> DataFrame"""
+        return {ticker: self.history(ticker, period, start, interval) for ticker in tickers}
+    
+    def latest_quote(self, ticker):
+        """Last traded price of a ticker"""
+        raise NotImplementedError
+    
+    def has_interval(self, ticker, interval):
+        """Whether bars of `interval` can be served for a ticker"""
+        return True
+    
+    def retention(self, interval):
+        """How far back bars of `interval` can be requested, None if without limit"""
+        return None
+    
+    def close(self):
+        """Release any threads or connections"""
+
+
+class YahooProvider(MarketDataProvider):
+    """Live bars and quotes from Yahoo Finance"""
+    
+    persist_bars = True
+    
+    def __init__(self):
+        import yfinance
+        self.yf = yfinance
+    
+    def retention(self, interval):
+        days = YAHOO_RETENTION_DAYS.get(interval)
+        return pd.Timedelta(days=days) if days else None
+    
+    def history(self, ticker, period=None, start=None, interval='5m'):
+        if start is not None:
+            return self.yf.Ticker(ticker).history(start=start, interval=interval,
+                                                  timeout=REQUEST_TIMEOUT)
+        return self.yf.Ticker(ticker).history(period=period, interval=interval,
+                                              timeout=REQUEST_TIMEOUT)
+    
+    def download(self, tickers, period=None, start=None, interval='5m'):
+        # One request for all tickers; yfinance fans it out over its own threads
+        if start is not None:
+            data = self.yf.download(tickers, start=start, interval=interval, group_by='ticker',
+                                    auto_adjust=True, progress=False, timeout=REQUEST_TIMEOUT)
+        else:
+            data = self.yf.download(tickers, period=period, interval=interval, group_by='ticker',
+                                    auto_adjust=True, progress=False, timeout=REQUEST_TIMEOUT)
+        return {ticker: self.extract_ticker_frame(data, ticker, len(tickers)) for ticker in tickers}
+    
+    def extract_ticker_frame(self, data, ticker, ticker_count):
+        """Pull a single ticker's bars out of a batched download"""
+        if data is None or data.empty:
+            return None
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                return None
+            frame = data[ticker]
+        elif ticker_count == 1:
+            frame = data
+        else:
+            return None
+        # Rows belonging only to other tickers come back as all NaN
+        return frame.dropna(how='all')
+    
+    def latest_quote(self, ticker):
+        # A single daily bar is the smallest response whose close is the
+        # last traded price
+        data = self.history(ticker, period='1d', interval='1d')
+        if data.empty:
+            raise ValueError(f"No quote for {ticker}")
+        return float(data['Close'].iloc[-1])
+
+
+class SimulatedClock:
+    """Clock that starts at a chosen time and runs `speed` times real time"""
+    
+    def __init__(self, start, speed=1.0):
+        self.start = start
+        self.speed = speed
+        self.started_at = time.monotonic()
+    
+    def now(self):
+        elapsed = (time.monotonic() - self.started_at) * self.speed
+        return self.start + pd.Timedelta(seconds=elapsed)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves recorded bars as if they were arriving live
+    
+    Files are <data_dir>/<SYMBOL>_<interval>.csv or <data_dir>/<SYMBOL>.csv;
+    an unsuffixed file only serves the interval its bars are spaced at.
+    The replay clock starts `warmup_sessions` sessions into the recording
+    and advances at `speed` times real time; only bars that have closed
+    by then are visible.
+    """
+    
+    def __init__(self, data_dir=REPLAY_DATA_DIR, speed=REPLAY_SPEED, warmup_sessions=5):
+        self.data_dir = data_dir
+        self.speed = speed
+        self.warmup_sessions = warmup_sessions
+        self.names = {symbol_config['ticker']: symbol_config['name']
+                      for symbol_config in SYMBOLS.values()}
+        self.frames = {}
+        self.unsuffixed = {}
+        self.clock = None
+    
+    def read(self, path):
+        frame = pd.read_csv(path, index_col=0)
+        frame.index = pd.to_datetime(frame.index, utc=True).tz_convert('Asia/Kolkata')
+        return frame.sort_index()
+    
+    def unsuffixed_frame(self, name):
+        """Bars of <name>.csv and the bar length in minutes they are spaced at"""
+        if name not in self.unsuffixed:
+            path = os.path.join(self.data_dir, f"{name}.csv")
+            if not os.path.exists(path):
+                self.unsuffixed[name] = (None, None)
+            else:
+                frame = self.read(path)
+                gaps = frame.index.to_series().diff().dropna()
+                minutes = round(gaps.min().total_seconds() / 60) if len(gaps) else None
+                self.unsuffixed[name] = (frame, minutes)
+        return self.unsuffixed[name]
+    
+    def find(self, ticker, interval):
+        """Recorded bars of a ticker at `interval`, or None"""
+        name = self.names.get(ticker, ticker)
+        path = os.path.join(self.data_dir, f"{name}_{interval}.csv")
+        if os.path.exists(path):
+            return self.read(path)
+        frame, minutes = self.unsuffixed_frame(name)
+        # Never serve bars of one interval as another
+        if frame is not None and minutes == INTERVAL_MINUTES.get(interval):
+            return frame
+        return None
+    
+    def load(self, ticker, interval):
+        key = (ticker, interval)
+        if key not in self.frames:
+            frame = self.find(ticker, interval)
+            if frame is None:
+                name = self.names.get(ticker, ticker)
+                raise FileNotFoundError(f"No {interval} bars for {name} in {self.data_dir}")
+            self.frames[key] = frame
+            if self.clock is None:
+                sessions = self.frames[key].index.normalize().unique()
+                start = sessions[min(self.warmup_sessions, len(sessions) - 1)]
+                self.clock = SimulatedClock(start + pd.Timedelta(hours=MARKET_OPEN_HOUR,
+                                                                 minutes=MARKET_OPEN_MINUTE),
+                                            self.speed)
+        return self.frames[key]
+    
+    def history(self, ticker, period=None, start=None, interval='5m'):
+        frame = self.load(ticker, interval)
+        # A bar is visible once it has closed
+        bar_length = pd.Timedelta(minutes=INTERVAL_MINUTES.get(interval, 5))
+        visible = frame[frame.index + bar_length <= self.clock.now()]
+        if start is not None:
+            return visible[visible.index >= pd.Timestamp(start)]
+        return trim_to_period(visible, period or '5d')
+    
+    def latest_quote(self, ticker):
+        data = self.history(ticker, period='1d', interval='1m' if self.has_interval(ticker, '1m') else '5m')
+        if data.empty:
+            raise ValueError(f"No quote for {ticker}")
+        return float(data['Close'].iloc[-1])
+    
+    def has_interval(self, ticker, interval):
+        name = self.names.get(ticker, ticker)
+        if os.path.exists(os.path.join(self.data_dir, f"{name}_{interval}.csv")):
+            return True
+        return self.unsuffixed_frame(name)[1] == INTERVAL_MINUTES.get(interval)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic random-walk bars for load and soak testing
+    
+    Every ticker gets its own seeded walk, so repeated runs see the same
+    prices. Bars are generated on demand up to the simulated clock.
+    """
+    
+    def __init__(self, seed=0, speed=1.0, volatility=0.0015, history_sessions=5):
+        self.seed = seed
+        self.volatility = volatility
+        self.history_sessions = history_sessions
+        self.clock = SimulatedClock(pd.Timestamp.now(tz='Asia/Kolkata').floor('min'), speed)
+        self.frames = {}
+        self.generators = {}
+    
+    def generate(self, ticker, interval, end):
+        """Extend a ticker's walk with every bar that has closed by `end`"""
+        minutes = INTERVAL_MINUTES.get(interval, 5)
+        bar_length = pd.Timedelta(minutes=minutes)
+        frame = self.frames.get((ticker, interval))
+        if frame is None:
+            first = (end - pd.Timedelta(days=self.history_sessions)).floor(f'{minutes}min')
+            last_close = 10000.0 + zlib.crc32(ticker.encode()) % 40000
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), minutes])
+        else:
+            first = frame.index[-1] + bar_length
+            last_close = float(frame['Close'].iloc[-1])
+            rng = self.generators[(ticker, interval)]
+        
+        count = int((end - first) // bar_length)
+        if count <= 0:
+            return frame
+        
+        returns = rng.normal(0, self.volatility * np.sqrt(minutes), count)
+        closes = last_close * np.exp(np.cumsum(returns))
+        opens = np.concatenate([[last_close], closes[:-1]])
+        spread = np.abs(rng.normal(0, self.volatility / 2, count)) * closes
+        new_bars = pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, closes) + spread,
+            'Low': np.minimum(opens, closes) - spread,
+            'Close': closes,
+            'Volume': rng.integers(1000, 100000, count).astype(float)
+        }, index=pd.date_range(first, periods=count, freq=bar_length))
+        
+        frame = new_bars if frame is None else pd.concat([frame, new_bars])
+        self.generators[(ticker, interval)] = rng
+        self.frames[(ticker, interval)] = frame
+        return frame
+    
+    def history(self, ticker, period=None, start=None, interval='5m'):
+        frame = self.generate(ticker, interval, self.clock.now())
+        if frame is None:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        return trim_to_period(frame, period or '5d')
+    
+    def latest_quote(self, ticker):
+        return float(self.history(ticker, period='1d', interval='1m')['Close'].iloc[-1])
+
+
+class ResilientProvider(MarketDataProvider):
+    """Wraps a provider with a circuit breaker and hedged quote requests
+    
+    While the source keeps failing the breaker fails calls immediately,
+    so cycles stay fast and callers fall back to the bars and quotes they
+    already have. A quote that hasn't come back after `hedge_delay`
+    seconds is requested a second time and the first answer wins.
+    """
+    
+    def __init__(self, provider, name, hedge_delay=HEDGE_DELAY):
+        self.provider = provider
+        self.persist_bars = provider.persist_bars
+        self.breaker = CircuitBreaker(name)
+        self.hedge_delay = hedge_delay
+        self.hedge_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS * 2,
+                                             thread_name_prefix='hedge')
+    
+    def history(self, ticker, period=None, start=None, interval='5m'):
+        # yfinance logs errors and hands back an empty frame rather than raising
+        return self.breaker.call(self.provider.history, ticker, period, start, interval,
+                                 is_failure=empty_bars)
+    
+    def download(self, tickers, period=None, start=None, interval='5m'):
+        # Not hedged: concurrent batch downloads share yfinance's global state
+        return self.breaker.call(self.provider.download, tickers, period, start, interval,
+                                 is_failure=empty_batch)
+    
+    def latest_quote(self, ticker):
+        return self.breaker.call(self.hedged, self.provider.latest_quote, ticker)
+    
+    def has_interval(self, ticker, interval):
+        return self.provider.has_interval(ticker, interval)
+    
+    def retention(self, interval):
+        return self.provider.retention(interval)
+    
+    def close(self):
+        # Hedges stuck on a dead connection are abandoned rather than waited for
+        self.hedge_pool.shutdown(wait=False, cancel_futures=True)
+        self.provider.close()
+    
+    def hedged(self, func, *args):
+        """Result of whichever of two identical requests succeeds first
+        
+        The second request only goes out once the first is slow or failed.
+        """
+        first = self.hedge_pool.submit(func, *args)
+        wait([first], timeout=self.hedge_delay)
+        if first.done() and first.exception() is None:
+            return first.result()
+        
+        pending = {self.hedge_pool.submit(func, *args)}
+        error = None
+        if first.done():
+            error = first.exception()
+        else:
+            pending.add(first)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+def create_provider(name=DATA_PROVIDER):
+    """Create the configured market data provider"""
+    if name == 'yahoo':
+        provider = YahooProvider()
+    elif name == 'replay':
+        provider = ReplayProvider()
+    elif name == 'synthetic':
+        provider = SyntheticProvider()
+    else:
+        raise ValueError(f"Unknown data provider: {name}")
+    return ResilientProvider(provider, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record Yahoo bars for replay and backtests')
+    parser.add_argument('command', choices=['record'])
+    parser.add_argument('data_dir')
+    parser.add_argument('--period', default='60d')
+    parser.add_argument('--interval', default='5m')
+    args = parser.parse_args()
+    
+    os.makedirs(args.data_dir, exist_ok=True)
+    provider = YahooProvider()
+    for symbol_name, symbol_config in SYMBOLS.items():
+        data = provider.history(symbol_config['ticker'], period=args.period, interval=args.interval)
+        path = os.path.join(args.data_dir, f"{symbol_name}_{args.interval}.csv")
+        data.to_csv(path)
+        print(f"✅ {symbol_name}: {len(data)} bars -> {path}")
+
+
+if __name__ == "__main__":
+    main()
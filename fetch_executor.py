@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import *
+
+class FetchExecutor:
+    def __init__(self, max_workers=FETCH_WORKERS, deadline=FETCH_DEADLINE):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+        self.deadline = deadline
+        self.in_flight = {}
+    
+    def run(self, jobs, deadline=None):
+        """Run named fetch jobs in parallel under a deadline
+        
+        Returns the results of the jobs that finished in time and the names
+        of the jobs that failed or missed the deadline.
+        """
+        if deadline is None:
+            deadline = self.deadline
+        
+        futures = {}
+        for name, job in jobs.items():
+            # A request still hanging from an earlier cycle is waited on
+            # again rather than piling a second one up behind it
+            previous = self.in_flight.pop(name, None)
+            if previous is not None and not previous.done():
+                futures[name] = previous
+            else:
+                futures[name] = self.pool.submit(job)
+        
+        done, _ = wait(futures.values(), timeout=deadline)
+        
+        results = {}
+        failed = []
+        for name, future in futures.items():
+            if future not in done:
+                self.in_flight[name] = future
+                failed.append(name)
+            elif future.exception() is not None:
+                print(f"Error in fetch job {name}: {future.exception()}")
+                failed.append(name)
+            else:
+                results[name] = future.result()
+        return results, failed
+    
+    def shutdown(self):
+        """Stop the worker pool without waiting on hung requests"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from config import *
+
+# Rule codes in the same precedence order as MarketAnalyzer.generate_signal
+NO_SIGNAL = 0
+RULE_STRONG_BUY = 1
+RULE_MODERATE_BUY = 2
+RULE_STRONG_SELL = 3
+RULE_MODERATE_SELL = 4
+RULE_VOLUME_SURGE = 5
+
+DEFAULT_SIGNAL_PARAMS = {
+    'rsi_oversold': RSI_OVERSOLD,
+    'rsi_overbought': RSI_OVERBOUGHT,
+    'rsi_buy_band': RSI_BUY_BAND,
+    'rsi_sell_band': RSI_SELL_BAND,
+    'momentum_threshold': MOMENTUM_THRESHOLD,
+    'volume_surge_factor': VOLUME_SURGE_FACTOR,
+    'volume_momentum_threshold': VOLUME_MOMENTUM_THRESHOLD
+}
+
+
+def rolling(values, window, func):
+    """Apply a reduction over trailing windows along the bar axis"""
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        windows = sliding_window_view(values, window, axis=1)
+        result[:, window - 1:] = func(windows, axis=-1)
+    return result
+
+
+def shifted(values, periods=1):
+    """Shift values right along the bar axis, filling with NaN"""
+    result = np.full(values.shape, np.nan)
+    result[:, periods:] = values[:, :-periods]
+    return result
+
+
+class IndicatorPanel:
+    """Aligned (symbols x bars) price arrays evaluated in one pass
+    
+    Each symbol's bars are right-aligned so the last column is every
+    symbol's latest bar. Shorter histories are padded with NaN on the left,
+    which keeps the rolling windows identical to per-symbol pandas ones.
+    """
+    
+    def __init__(self, names, closes, highs, lows, volumes, timestamps):
+        self.names = list(names)
+        self.closes = closes
+        self.highs = highs
+        self.lows = lows
+        self.volumes = volumes
+        self.timestamps = timestamps
+    
+    @classmethod
+    def from_frames(cls, frames):
+        """Build a panel from a dict of name -> OHLCV DataFrame"""
+        names = list(frames)
+        width = max((len(frame) for frame in frames.values()), default=0)
+        shape = (len(names), width)
+        closes = np.full(shape, np.nan)
+        highs = np.full(shape, np.nan)
+        lows = np.full(shape, np.nan)
+        volumes = np.full(shape, np.nan)
+        timestamps = np.full(shape, np.datetime64('NaT'), dtype='datetime64[ns]')
+        
+        for row, name in enumerate(names):
+            frame = frames[name]
+            start = width - len(frame)
+            closes[row, start:] = frame['Close'].to_numpy(dtype=float)
+            highs[row, start:] = frame['High'].to_numpy(dtype=float)
+            lows[row, start:] = frame['Low'].to_numpy(dtype=float)
+            volumes[row, start:] = frame['Volume'].to_numpy(dtype=float)
+            index = frame.index
+            if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+                index = index.tz_convert('UTC').tz_localize(None)
+            timestamps[row, start:] = index.to_numpy(dtype='datetime64[ns]')
+        
+        return cls(names, closes, highs, lows, volumes, timestamps)
+    
+    def compute(self, rsi_period=14, sr_period=20, volume_window=BAR_CACHE_MAX_BARS):
+        """Compute every indicator generate_signal uses for every bar"""
+        closes = self.closes
+        valid = ~np.isnan(closes)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = closes - shifted(closes)
+            # diff() leaves NaN on a symbol's first bar, which counts as 0
+            gain = np.where(valid, np.where(delta > 0, delta, 0.0), np.nan)
+            loss = np.where(valid, np.where(delta < 0, -delta, 0.0), np.nan)
+            avg_gain = rolling(gain, rsi_period, np.mean)
+            avg_loss = rolling(loss, rsi_period, np.mean)
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+            
+            ma5 = rolling(closes, 5, np.mean)
+            ma20 = rolling(closes, 20, np.mean)
+            ma50 = rolling(closes, 50, np.mean)
+            
+            previous_ma5 = shifted(ma5)
+            previous_ma20 = shifted(ma20)
+            crossover = np.zeros(closes.shape, dtype=np.int8)
+            crossover[(previous_ma5 <= previous_ma20) & (ma5 > ma20)] = 1
+            crossover[(previous_ma5 >= previous_ma20) & (ma5 < ma20)] = -1
+            
+            previous_close = shifted(closes)
+            momentum = np.where(valid, (closes - previous_close) / previous_close * 100, np.nan)
+        
+        # Live frames hold at most volume_window bars, so the frame's mean
+        # volume is a trailing mean over that many bars
+        volume_totals = np.cumsum(np.where(valid, self.volumes, 0.0), axis=1)
+        window_totals = volume_totals.copy()
+        if closes.shape[1] > volume_window:
+            window_totals[:, volume_window:] -= volume_totals[:, :-volume_window]
+        bar_counts = np.cumsum(valid, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_mean = window_totals / np.minimum(bar_counts, volume_window)
+        
+        return {
+            'close': closes,
+            'rsi': rsi,
+            'ma5': ma5,
+            'ma20': ma20,
+            'ma50': ma50,
+            'support': rolling(self.lows, sr_period, np.min),
+            'resistance': rolling(self.highs, sr_period, np.max),
+            'crossover': crossover,
+            'momentum': momentum,
+            'volume': self.volumes,
+            'volume_mean': volume_mean,
+            'bar_count': bar_counts
+        }
+
+
+def evaluate_signals(indicators, params=None, min_bars=50):
+    """Run the generate_signal rule cascade over whole indicator arrays
+    
+    Returns the rule code and direction (1 BUY, -1 SELL, 0 none) per bar.
+    """
+    p = dict(DEFAULT_SIGNAL_PARAMS)
+    if params:
+        p.update(params)
+    
+    close = indicators['close']
+    rsi = indicators['rsi']
+    crossover = indicators['crossover']
+    momentum = indicators['momentum']
+    
+    with np.errstate(invalid='ignore'):
+        volume_surge = indicators['volume'] > indicators['volume_mean'] * p['volume_surge_factor']
+        conditions = [
+            (rsi < p['rsi_oversold']) & ((crossover == 1) | (momentum > p['momentum_threshold'])),
+            (rsi < p['rsi_buy_band']) & (close < indicators['support'] * 1.01),
+            (rsi > p['rsi_overbought']) & ((crossover == -1) | (momentum < -p['momentum_threshold'])),
+            (rsi > p['rsi_sell_band']) & (close > indicators['resistance'] * 0.99),
+            volume_surge & (np.abs(momentum) > p['volume_momentum_threshold'])
+        ]
+    rules = np.select(conditions, [RULE_STRONG_BUY, RULE_MODERATE_BUY, RULE_STRONG_SELL,
+                                   RULE_MODERATE_SELL, RULE_VOLUME_SURGE], NO_SIGNAL)
+    rules[indicators['bar_count'] < min_bars] = NO_SIGNAL
+    
+    direction = np.zeros(rules.shape, dtype=np.int8)
+    direction[(rules == RULE_STRONG_BUY) | (rules == RULE_MODERATE_BUY)] = 1
+    direction[(rules == RULE_STRONG_SELL) | (rules == RULE_MODERATE_SELL)] = -1
+    volume_rule = rules == RULE_VOLUME_SURGE
+    direction[volume_rule & (momentum > 0)] = 1
+    direction[volume_rule & ~(momentum > 0)] = -1
+    return rules.astype(np.int8), direction
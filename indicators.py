@@ -0,0 +1,229 @@
+import math
+from collections import deque
+import numpy as np
+from config import *
+
+class RollingWindow:
+    """Running sum over the last `size` committed values
+    
+    NaN values take up a slot but stay out of the sum, so like a pandas
+    rolling mean the window reads NaN only while one is inside it.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+        self.nan_count = 0
+    
+    def add(self, value):
+        # Kahan summation keeps the running sum in step with a fresh sum
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+    
+    def push(self, value):
+        self.values.append(value)
+        if math.isnan(value):
+            self.nan_count += 1
+        else:
+            self.add(value)
+        if len(self.values) > self.size:
+            dropped = self.values.popleft()
+            if math.isnan(dropped):
+                self.nan_count -= 1
+            else:
+                self.add(-dropped)
+    
+    def mean(self):
+        """Mean of the committed window, NaN until it is full"""
+        if len(self.values) < self.size or self.nan_count:
+            return math.nan
+        return self.total / self.size
+    
+    def peek_sum(self, value):
+        """Sum and count of the non-NaN values in the window ending with a provisional value"""
+        total = self.total
+        count = len(self.values) - self.nan_count
+        if not math.isnan(value):
+            total += value
+            count += 1
+        if len(self.values) + 1 > self.size and not math.isnan(self.values[0]):
+            total -= self.values[0]
+            count -= 1
+        return total, count
+    
+    def peek_mean(self, value):
+        """Mean of the window ending with a provisional value, NaN until full"""
+        total, count = self.peek_sum(value)
+        # Short of `size` values means not yet full or a NaN inside
+        if count < self.size:
+            return math.nan
+        return total / count
+
+
+class RollingExtreme:
+    """Monotonic deque tracking the min or max of the last `size` values"""
+    
+    def __init__(self, size, mode='min'):
+        self.size = size
+        self.better = (lambda a, b: a <= b) if mode == 'min' else (lambda a, b: a >= b)
+        self.window = deque()
+        self.position = 0
+    
+    def push(self, value):
+        while self.window and self.better(value, self.window[-1][1]):
+            self.window.pop()
+        self.window.append((self.position, value))
+        self.position += 1
+        if self.window[0][0] <= self.position - 1 - self.size:
+            self.window.popleft()
+    
+    def peek(self, value):
+        """Extreme of the window ending with a provisional value, NaN until full"""
+        if self.position + 1 < self.size:
+            return math.nan
+        # The committed window holds size - 1 values once a provisional one joins
+        front = self.window[0]
+        if front[0] <= self.position - self.size:
+            front = self.window[1] if len(self.window) > 1 else None
+        if front is None or self.better(value, front[1]):
+            return value
+        return front[1]
+
+
+class IndicatorEngine:
+    """Incrementally maintained indicators for a single symbol
+    
+    Every bar except the last one in a frame is committed into running
+    state once. The last bar may still be forming, so it is only evaluated
+    against the committed state and never folded into it. Results match the
+    pandas formulas in MarketAnalyzer up to float rounding.
+    """
+    
+    def __init__(self, rsi_period=14, ma_periods=(5, 20, 50), sr_period=20,
+                 volume_window=BAR_CACHE_MAX_BARS):
+        self.rsi_period = rsi_period
+        self.ma_periods = ma_periods
+        self.sr_period = sr_period
+        self.volume_window = volume_window
+        self.reset()
+    
+    def reset(self):
+        """Drop all committed state"""
+        self.last_timestamp = None
+        self.last_close = None
+        self.bar_count = 0
+        self.gains = RollingWindow(self.rsi_period)
+        self.losses = RollingWindow(self.rsi_period)
+        self.moving_averages = {period: RollingWindow(period) for period in self.ma_periods}
+        self.lows = RollingExtreme(self.sr_period, 'min')
+        self.highs = RollingExtreme(self.sr_period, 'max')
+        self.volumes = RollingWindow(self.volume_window)
+    
+    def commit(self, timestamp, close, high, low, volume):
+        """Fold a completed bar into the running state"""
+        gain, loss = self.price_change(close)
+        self.gains.push(gain)
+        self.losses.push(loss)
+        for window in self.moving_averages.values():
+            window.push(close)
+        self.lows.push(low)
+        self.highs.push(high)
+        self.volumes.push(volume)
+        self.last_timestamp = timestamp
+        self.last_close = close
+        self.bar_count += 1
+    
+    def price_change(self, close):
+        """Gain and loss against the last committed close"""
+        # Matches diff() on the first bar: NaN counts as neither gain nor loss
+        if self.last_close is None:
+            return 0.0, 0.0
+        delta = close - self.last_close
+        return max(delta, 0.0), max(-delta, 0.0)
+    
+    def update(self, data):
+        """Catch up with a bar frame and return indicators for its last bar"""
+        if data is None:
+            return None
+        # A bar without prices would leave NaN in the running state
+        priced = ~(np.isnan(data['Close'].to_numpy(dtype=float))
+                   | np.isnan(data['High'].to_numpy(dtype=float))
+                   | np.isnan(data['Low'].to_numpy(dtype=float)))
+        if not priced.all():
+            data = data[priced]
+        if len(data) < 2:
+            return None
+        
+        index = data.index
+        if self.last_timestamp is None:
+            start = 0
+        else:
+            start = index.searchsorted(self.last_timestamp, side='right')
+            stale = start == 0 or index[start - 1] != self.last_timestamp
+            # The committed bars plus the forming one must be the whole frame
+            # for the volume mean to line up with the frame's own mean
+            committed = self.bar_count + len(index) - 1 - start
+            expected = min(committed, self.volume_window - 1) + 1
+            if stale or expected != len(index):
+                self.reset()
+                start = 0
+        
+        closes = data['Close'].to_numpy()
+        highs = data['High'].to_numpy()
+        lows = data['Low'].to_numpy()
+        volumes = data['Volume'].to_numpy()
+        for position in range(start, len(index) - 1):
+            self.commit(index[position], float(closes[position]), float(highs[position]),
+                        float(lows[position]), float(volumes[position]))
+        
+        return self.evaluate(float(closes[-1]), float(highs[-1]), float(lows[-1]),
+                             float(volumes[-1]))
+    
+    def evaluate(self, close, high, low, volume):
+        """Indicators for a provisional bar on top of the committed state"""
+        gain, loss = self.price_change(close)
+        avg_gain = self.gains.peek_mean(gain)
+        avg_loss = self.losses.peek_mean(loss)
+        rsi = self.rsi_from_averages(avg_gain, avg_loss)
+        
+        ma_data = {}
+        for period, window in self.moving_averages.items():
+            ma_data[f'MA{period}'] = (window.mean(), window.peek_mean(close))
+        
+        volume_total, volume_count = self.volumes.peek_sum(volume)
+        momentum = ((close - self.last_close) / self.last_close) * 100
+        
+        return {
+            'close': close,
+            'rsi': rsi,
+            'ma': ma_data,
+            'crossover': self.detect_crossover(ma_data),
+            'support': self.lows.peek(low),
+            'resistance': self.highs.peek(high),
+            'momentum': momentum,
+            'volume': volume,
+            'volume_mean': volume_total / volume_count
+        }
+    
+    def rsi_from_averages(self, avg_gain, avg_loss):
+        """RSI with the same division semantics as the pandas formula"""
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return math.nan
+        if avg_loss == 0:
+            return math.nan if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+    
+    def detect_crossover(self, ma_data):
+        """Detect golden cross and death cross from previous and current MAs"""
+        previous_short, current_short = ma_data['MA5']
+        previous_long, current_long = ma_data['MA20']
+        
+        if previous_short <= previous_long and current_short > current_long:
+            return 'GOLDEN_CROSS'
+        if previous_short >= previous_long and current_short < current_long:
+            return 'DEATH_CROSS'
+        return None
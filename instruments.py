@@ -0,0 +1,26 @@
+import csv
+
+def load_instruments(path):
+    """Load the symbol universe from a CSV of name, ticker, lot_size, strike_step, expiry_weekday
+    
+    F&O stocks go in the same file as the indices, e.g.
+    RELIANCE,RELIANCE.NS,250,20,1
+    expiry_weekday (Monday = 0) may be left empty to use OPTION_EXPIRY_WEEKDAY.
+    """
+    symbols = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            name = row['name'].strip().upper()
+            if not name or name.startswith('#'):
+                continue
+            strike_step = float(row['strike_step'])
+            symbols[name] = {
+                'ticker': row['ticker'].strip(),
+                'name': name,
+                'lot_size': int(row['lot_size']),
+                'strike_step': int(strike_step) if strike_step.is_integer() else strike_step
+            }
+            expiry_weekday = (row.get('expiry_weekday') or '').strip()
+            if expiry_weekday:
+                symbols[name]['expiry_weekday'] = int(expiry_weekday)
+    return symbols
@@ -8,16 +8,19 @@ Version: 1.0.0
 import time
 import signal
 import sys
+import threading
 import logging
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import yfinance as yf
 
 from config import *
-from market_analyzer import MarketAnalyzer
 from trade_manager import TradeManager
 from notifier import TelegramNotifier
 from utils import MarketUtils
+from confirmation_listener import ConfirmationListener
+from scheduler import Scheduler
+from metrics import metrics
+from profiler import CycleProfiler
 
 # Setup logging
 logging.basicConfig(
@@ -32,18 +35,38 @@ logger = logging.getLogger('Sensexy')
 
 
 class SensexyBot:
-        def __init__(self):
-            self.analyzer = MarketAnalyzer()
-            self.trade_manager = TradeManager()
-            self.notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
-            self.utils = MarketUtils()
+        def __init__(self, analyzer=None, trade_manager=None, notifier=None, utils=None):
+            # Created on first use, so the pandas/yfinance stack isn't paid
+            # for until analysis actually runs
+            self._analyzer = analyzer
+            self.analyzer_lock = threading.Lock()
+            self.trade_manager = trade_manager or TradeManager()
+            self.notifier = notifier or TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+            self.utils = utils or MarketUtils()
             self.ist = ZoneInfo("Asia/Kolkata")
             self.running = True
             self.last_analysis_time = None
+            self.scheduler = Scheduler(self.utils)
+            self.profiler = CycleProfiler()
+            self.notifier.add_command('profile', self.profile_command)
+            self.listener = None
+            if CONFIRMATION_LISTENER:
+                self.listener = ConfirmationListener(self.notifier, self.execute_signal)
             
             logger.info("Sensexy Bot initialized successfully")
             self.send_startup_message()
         
+        @property
+        def analyzer(self):
+            """Market analyzer, importing the analytics stack on first use"""
+            if self._analyzer is None:
+                # The exit monitor thread may get here at the same time
+                with self.analyzer_lock:
+                    if self._analyzer is None:
+                        from market_analyzer import MarketAnalyzer
+                        self._analyzer = MarketAnalyzer()
+            return self._analyzer
+        
         def send_startup_message(self):
             """Send startup message to Telegram"""
             message = f"""
@@ -63,17 +86,9 @@ class SensexyBot:
             self.notifier.send_message(message)
         
         def get_current_prices(self):
-            """Get current prices for all symbols"""
-            prices = {}
-            for symbol_name, symbol_config in SYMBOLS.items():
-                try:
-                    ticker = yf.Ticker(symbol_config['ticker'])
-                    data = ticker.history(period='1d', interval='1m')
-                    if not data.empty:
-                        prices[symbol_name] = data['Close'].iloc[-1]
-                except Exception as e:
-                    logger.error(f"Error fetching price for {symbol_name}: {e}")
-            return prices
+            """Get current prices for all symbols, with the ages of cached ones"""
+            # Reuses the bars downloaded by this cycle's analysis
+            return self.analyzer.get_latest_prices()
         
         def analyze_markets(self):
             """Analyze markets and generate signals"""
@@ -84,27 +99,49 @@ class SensexyBot:
             
             # Get signals from analyzer
             signals = self.analyzer.analyze_all_symbols()
+            if self.analyzer.stale_symbols:
+                logger.warning(f"Using last good data for: {', '.join(self.analyzer.stale_symbols)}")
             
             if signals:
                 for signal in signals:
                     # Store signal as pending and send to Telegram
-                    signal_id = f"SIG_{datetime.now().strftime('%H%M%S')}"
-                    self.notifier.pending_signals[signal_id] = signal
+                    self.notifier.pending_signals.add(signal)
                     
                     # Send signal message
                     message = self.notifier.format_signal_message(signal)
                     self.notifier.send_message(message)
+                    metrics.inc('sensexy_signals_total', symbol=signal['symbol'])
                     
                     logger.info(f"Signal sent for {signal['symbol']} {signal['option_type']}")
             
             # Update existing trades
-            current_prices = self.get_current_prices()
-            closed_trades = self.trade_manager.update_trade_prices(current_prices)
+            self.check_exits(*self.get_current_prices())
+        
+        def monitor_exits(self):
+            """Check open positions against their targets and stops between analyses"""
+            symbols = self.trade_manager.get_open_symbols()
+            if not symbols:
+                return
+            # Only quote the symbols we hold, on their own light request
+            self.check_exits(*self.analyzer.get_quotes(symbols))
+        
+        def check_exits(self, current_prices, price_ages=None):
+            """Update existing trades and announce the ones that closed
+            
+            `price_ages` holds the ages of prices served from the quote cache.
+            """
+            price_ages = price_ages or {}
+            stale = [f"{name} ({age:.0f}s)" for name, age in price_ages.items()
+                     if age > STALE_PRICE_WARNING]
+            if stale:
+                logger.warning(f"Checking exits on last known prices for: {', '.join(stale)}")
+            closed_trades = self.trade_manager.update_trade_prices(current_prices, price_ages)
             
             # Send notifications for closed trades
             for trade in closed_trades:
                 message = self.notifier.format_trade_close_message(trade)
                 self.notifier.send_message(message)
+                metrics.inc('sensexy_exits_total', reason=trade['exit_reason'])
                 logger.info(f"Trade {trade['id']} closed: {trade['exit_reason']}")
         
         def process_confirmations(self):
@@ -112,25 +149,30 @@ class SensexyBot:
             confirmed_signals = self.notifier.process_user_responses()
             
             for signal in confirmed_signals:
-                # Create trade
-                trade, error = self.trade_manager.create_trade(signal)
-                
-                if trade:
-                    # Send execution confirmation
-                    message = self.notifier.format_trade_execution_message(trade)
-                    self.notifier.send_message(message)
-                    logger.info(f"Trade executed: {trade['id']}")
-                else:
-                    # Send error message
-                    error_msg = f"❌ <b>Trade Execution Failed</b>\n{error}"
-                    self.notifier.send_message(error_msg)
-                    logger.error(f"Trade execution failed: {error}")
+                self.execute_signal(signal)
+        
+        def execute_signal(self, signal):
+            """Create a trade for a confirmed signal"""
+            trade, error = self.trade_manager.create_trade(signal)
+            
+            if trade:
+                metrics.inc('sensexy_confirmations_total')
+                # Send execution confirmation
+                message = self.notifier.format_trade_execution_message(trade)
+                self.notifier.send_message(message)
+                logger.info(f"Trade executed: {trade['id']}")
+            else:
+                # Send error message
+                error_msg = f"❌ <b>Trade Execution Failed</b>\n{error}"
+                self.notifier.send_message(error_msg)
+                logger.error(f"Trade execution failed: {error}")
         
         def send_daily_summary(self):
             """Send daily portfolio summary"""
             summary = self.trade_manager.get_portfolio_summary()
             self.notifier.send_portfolio_summary(summary)
-            logger.info("Daily summary sent")
+            logger.info(f"Daily summary sent, {self.notifier.pending_signals.expired_count} "
+                        f"signals expired unconfirmed so far")
         
         def run_analysis_cycle(self):
             """Run a complete analysis cycle"""
@@ -139,16 +181,14 @@ class SensexyBot:
                 if not self.utils.is_market_open():
                     return
                 
-                # Run analysis
-                self.analyze_markets()
-                
-                # Process any pending confirmations
-                self.process_confirmations()
-                
-                # Send periodic summary (every hour)
-                current_time = datetime.now(self.ist)
-                if current_time.minute == 0:  # On the hour
-                    self.send_daily_summary()
+                with self.profiler.cycle(), \
+                        metrics.timer('sensexy_stage_seconds', stage='cycle', symbol='all'):
+                    # Run analysis
+                    self.analyze_markets()
+                    
+                    # Process any pending confirmations unless the listener does
+                    if not self.listener:
+                        self.process_confirmations()
                 
             except Exception as e:
                 logger.error(f"Error in analysis cycle: {e}")
@@ -161,6 +201,22 @@ class SensexyBot:
             self.running = False
             self.shutdown()
         
+        def profile_signal_handler(self, signum, frame):
+            """Profile the next cycles on SIGUSR1"""
+            if self.profiler.request():
+                logger.info(f"Profiling the next {self.profiler.default_cycles} cycles")
+        
+        def profile_command(self, args):
+            """Handle /profile [cycles] from Telegram"""
+            try:
+                cycles = self.profiler.request(int(args[0]) if args else None)
+            except ValueError:
+                return f"❓ Usage: /profile [cycles], cycles from 1 to {self.profiler.max_cycles}"
+            if not cycles:
+                return "⏳ A profile is already being captured"
+            logger.info(f"Profiling the next {cycles} cycles")
+            return f"🔬 Profiling the next {cycles} analysis cycles into {self.profiler.output_dir}/"
+        
         def shutdown(self):
             """Clean shutdown"""
             message = f"""
@@ -177,6 +233,19 @@ class SensexyBot:
     <i>Bot stopped at {datetime.now(self.ist).strftime('%H:%M:%S IST')}</i>
             """
             self.notifier.send_message(message)
+            if self.listener:
+                self.listener.stop()
+            self.scheduler.stop()
+            self.trade_manager.save_prices()
+            self.notifier.close()
+            if METRICS_FILE:
+                metrics.write_file()
+            if self._analyzer:
+                self._analyzer.fetch_executor.shutdown()
+                self._analyzer.quote_executor.shutdown()
+                self._analyzer.provider.close()
+                if self._analyzer.scanner:
+                    self._analyzer.scanner.close()
             logger.info("Sensexy Bot stopped")
             sys.exit(0)
         
@@ -185,8 +254,30 @@ class SensexyBot:
             # Setup signal handlers
             signal.signal(signal.SIGINT, self.signal_handler)
             signal.signal(signal.SIGTERM, self.signal_handler)
+            if hasattr(signal, 'SIGUSR1'):
+                signal.signal(signal.SIGUSR1, self.profile_signal_handler)
             
             logger.info("Starting main bot loop...")
+            if self.listener:
+                self.listener.start()
+            if METRICS_PORT:
+                try:
+                    metrics.serve()
+                    logger.info(f"Metrics at http://127.0.0.1:{METRICS_PORT}/metrics")
+                except OSError as e:
+                    # Most likely the port is taken; the bot runs fine without it
+                    logger.warning(f"Metrics endpoint not started on port {METRICS_PORT}: {e}")
+            
+            # Analysis right after each bar closes, exits checked in between
+            # and the summary on the hour
+            self.scheduler.every('analysis', ANALYSIS_INTERVAL, self.run_analysis_cycle,
+                                 offset=BAR_CLOSE_DELAY)
+            self.scheduler.every('exit-monitor', EXIT_CHECK_INTERVAL, self.monitor_exits,
+                                 background=True)
+            self.scheduler.hourly('summary', self.send_daily_summary, minute=SUMMARY_MINUTE)
+            if METRICS_FILE:
+                self.scheduler.every('metrics-file', METRICS_FILE_INTERVAL, metrics.write_file,
+                                     market_hours_only=False, background=True)
             
             while self.running:
                 try:
@@ -203,12 +294,16 @@ class SensexyBot:
                         while not self.utils.is_market_open() and self.running:
                             time.sleep(60)  # Check every minute
                             # Process any pending confirmations even when market is closed
-                            self.process_confirmations()
+                            if not self.listener:
+                                self.process_confirmations()
+                        
+                        # Don't count the closed hours as overrun slots
+                        self.scheduler.reset()
                     
-                    # Market is open, run analysis
+                    # Market is open, run whatever is due
                     if self.running:
-                        self.run_analysis_cycle()
-                        time.sleep(ANALYSIS_INTERVAL)  # Wait 5 minutes
+                        self.scheduler.run_pending()
+                        self.scheduler.sleep()
                     
                 except Exception as e:
                     logger.error(f"Error in main loop: {e}")
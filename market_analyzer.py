@@ -1,26 +1,196 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import time
 import pytz
 from config import *
+from bar_cache import BarCache
+from bar_store import create_bar_store
+from data_provider import create_provider, INTERVAL_MINUTES
+from metrics import metrics
+from fetch_executor import FetchExecutor
+from options import OptionLadder, implied_volatility
+from quote_cache import QuoteCache
+from resampler import TimeframeSet
+from scanner import UniverseScanner
+from indicators import IndicatorEngine
+from indicator_panel import (IndicatorPanel, evaluate_signals, NO_SIGNAL, RULE_STRONG_BUY,
+                             RULE_MODERATE_BUY, RULE_STRONG_SELL, RULE_MODERATE_SELL,
+                             RULE_VOLUME_SURGE)
+
+# Confidence and reason for each rule of the signal cascade
+RULE_DESCRIPTIONS = {
+    RULE_STRONG_BUY: ('HIGH', "RSI oversold ({rsi:.1f}) + Bullish momentum"),
+    RULE_MODERATE_BUY: ('MEDIUM', "Near support level + RSI low ({rsi:.1f})"),
+    RULE_STRONG_SELL: ('HIGH', "RSI overbought ({rsi:.1f}) + Bearish momentum"),
+    RULE_MODERATE_SELL: ('MEDIUM', "Near resistance level + RSI high ({rsi:.1f})"),
+    RULE_VOLUME_SURGE: ('MEDIUM', "Volume surge + {move:.1f}% price move")
+}
+
+
+def signal_priority(hit):
+    """Sort key putting HIGH confidence rules, then the biggest moves, first"""
+    name, rule, direction, close, rsi, momentum = hit
+    return (RULE_DESCRIPTIONS[rule][0] != 'HIGH', rule, -abs(momentum))
 
 class MarketAnalyzer:
-    def __init__(self):
+    def __init__(self, provider=None):
         self.ist = pytz.timezone('Asia/Kolkata')
         self.signals_cache = {}
         self.last_signal_time = {}
+        self.provider = provider or create_provider()
+        self.bar_cache = BarCache(store=create_bar_store(self.provider),
+                                  interval_limits={BASE_INTERVAL: BASE_MAX_BARS})
+        self.timeframes = {}
+        self.market_data = {}
+        self.stale_symbols = []
+        self.fetch_executor = FetchExecutor()
+        self.quote_executor = FetchExecutor(deadline=QUOTE_DEADLINE)
+        self.indicator_engines = {}
+        self.scanner = None
+        self.quotes = QuoteCache()
         
+    def symbol_name(self, ticker):
+        """Configured name of a ticker, which is what metrics are labelled with"""
+        for symbol_config in SYMBOLS.values():
+            if symbol_config['ticker'] == ticker:
+                return symbol_config['name']
+        return ticker
+    
+    def resume_timestamp(self, ticker, interval):
+        """Last cached bar to fetch onwards from, or None when a full fetch is needed"""
+        last_timestamp = self.bar_cache.last_timestamp(ticker, interval)
+        retention = self.provider.retention(interval)
+        if last_timestamp is None or retention is None:
+            return last_timestamp
+        if last_timestamp < pd.Timestamp.now(tz=last_timestamp.tz) - retention:
+            # Bars warm started from an old store: the source rejects a start
+            # that far back, so drop them and fetch the full period instead
+            print(f"Stored {interval} bars for {ticker} are older than the source keeps, refetching")
+            self.bar_cache.clear(ticker, interval)
+            return None
+        return last_timestamp
+    
     def fetch_data(self, symbol, period='5d', interval='5m'):
-        """Fetch market data from Yahoo Finance"""
+        """Fetch market data from the data provider"""
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period, interval=interval)
-            return data
+            last_timestamp = self.resume_timestamp(symbol, interval)
+            with metrics.timer('sensexy_stage_seconds', stage='fetch', symbol=self.symbol_name(symbol)):
+                if last_timestamp is None:
+                    data = self.provider.history(symbol, period=period, interval=interval)
+                else:
+                    # Only pull bars from the last cached one onwards
+                    data = self.provider.history(symbol, start=last_timestamp, interval=interval)
+            return self.bar_cache.merge(symbol, interval, data)
         except Exception as e:
+            metrics.inc('sensexy_api_errors_total', api='market_data')
             print(f"Error fetching data for {symbol}: {e}")
             return None
     
+    def refresh_data(self, period='5d', interval='5m'):
+        """Fetch bars for all configured symbols in one batched request
+        
+        With a base interval configured only base bars are downloaded, and
+        `interval` and the other timeframes are resampled from them.
+        """
+        tickers = [symbol_config['ticker'] for symbol_config in SYMBOLS.values()]
+        fetch_interval = self.fetch_interval(tickers, interval)
+        results, failed = self.fetch_executor.run({
+            'batch': lambda: self.download_batch(tickers, period, fetch_interval)
+        })
+        frames = results.get('batch') or {}
+        if failed:
+            metrics.inc('sensexy_api_errors_total', api='market_data')
+            print(f"Batch download missed the {self.fetch_executor.deadline}s deadline or failed")
+        
+        market_data = {}
+        stale_symbols = []
+        for ticker in tickers:
+            frame = frames.get(ticker)
+            if frame is None or frame.empty:
+                stale_symbols.append(ticker)
+            # Merging nothing leaves the last good bars in place
+            merged = self.bar_cache.merge(ticker, fetch_interval, frame)
+            if merged is not None and fetch_interval != interval:
+                timeframes = self.timeframes.get(ticker)
+                if timeframes is None:
+                    timeframes = self.timeframes[ticker] = TimeframeSet()
+                merged = timeframes.update(merged)[interval]
+            if merged is not None:
+                market_data[ticker] = merged
+        
+        self.market_data = market_data
+        self.stale_symbols = stale_symbols
+        return market_data
+    
+    def fetch_interval(self, tickers, interval):
+        """Base interval when the provider serves it for every ticker, else `interval`"""
+        # Replays recorded at the analysis interval have no base bars
+        if BASE_INTERVAL and all(self.provider.has_interval(ticker, BASE_INTERVAL)
+                                 for ticker in tickers):
+            return BASE_INTERVAL
+        return interval
+    
+    def download_batch(self, tickers, period, interval):
+        """Download bars for several tickers with a single request"""
+        last_timestamps = [self.resume_timestamp(ticker, interval) for ticker in tickers]
+        # One request serves every symbol, so its time is not split per symbol
+        with metrics.timer('sensexy_stage_seconds', stage='fetch', symbol='batch'):
+            if any(timestamp is None for timestamp in last_timestamps):
+                return self.provider.download(tickers, period=period, interval=interval)
+            # Only pull bars from the oldest last cached bar onwards
+            return self.provider.download(tickers, start=min(last_timestamps), interval=interval)
+    
+    def get_latest_prices(self, refresh=False):
+        """Get the last close for all symbols from this cycle's data
+        
+        Returns the prices and the ages of those filled from the quote cache.
+        """
+        if refresh or not self.market_data:
+            self.refresh_data()
+        
+        prices = {}
+        for symbol_name, symbol_config in SYMBOLS.items():
+            # A stale symbol's last close is only as good as its cached quote
+            if symbol_config['ticker'] in self.stale_symbols:
+                continue
+            data = self.market_data.get(symbol_config['ticker'])
+            if data is not None and not data.empty:
+                prices[symbol_name] = data['Close'].iloc[-1]
+        return self.fill_prices(prices, SYMBOLS)
+    
+    def fetch_quote(self, symbol):
+        """Fetch the last traded price for a ticker"""
+        with metrics.timer('sensexy_stage_seconds', stage='quote', symbol=self.symbol_name(symbol)):
+            return self.provider.latest_quote(symbol)
+    
+    def get_quotes(self, symbol_names):
+        """Get latest quotes for a few symbols in parallel
+        
+        Returns the prices and the ages of those filled from the quote cache.
+        """
+        jobs = {}
+        for name in symbol_names:
+            if name in SYMBOLS:
+                ticker = SYMBOLS[name]['ticker']
+                jobs[name] = lambda ticker=ticker: self.fetch_quote(ticker)
+        quotes, failed = self.quote_executor.run(jobs)
+        if failed:
+            metrics.inc('sensexy_api_errors_total', amount=len(failed), api='market_data')
+            print(f"No fresh quote for: {', '.join(failed)}")
+        return self.fill_prices(quotes, jobs)
+    
+    def fill_prices(self, prices, names):
+        """Remember fresh prices and fill the missing ones from the quote cache
+        
+        Returns the filled prices and the ages of the cached ones. Both go
+        back to the caller rather than onto the analyzer, since analysis
+        and the exit monitor fetch prices on different threads.
+        """
+        self.quotes.update(prices)
+        filled = self.quotes.fill(prices, names)
+        return filled, self.quotes.ages([name for name in filled if name not in prices])
+    
     def calculate_rsi(self, data, period=14):
         """Calculate Relative Strength Index"""
         delta = data['Close'].diff()
@@ -69,33 +239,37 @@ class MarketAnalyzer:
                        data['Close'].iloc[-2]) * 100
         return price_change
     
-    def generate_signal(self, symbol_config):
+    def generate_signal(self, symbol_config, data=None):
         """Generate trading signal based on technical indicators"""
         symbol = symbol_config['ticker']
         name = symbol_config['name']
         
         # Check if we recently sent a signal
         current_time = datetime.now(self.ist)
-        if name in self.last_signal_time:
-            time_diff = (current_time - self.last_signal_time[name]).seconds
-            if time_diff < 600:  # 10 minute cooldown
-                return None
+        if self.in_cooldown(name, current_time):
+            return None
         
-        # Fetch market data
-        data = self.fetch_data(symbol)
+        # Fetch market data unless the cycle already has it
+        if data is None:
+            data = self.fetch_data(symbol)
         if data is None or len(data) < 50:
             return None
         
-        # Calculate indicators
-        rsi = self.calculate_rsi(data)
-        ma_data = self.calculate_moving_averages(data)
-        support, resistance = self.calculate_support_resistance(data)
-        crossover = self.detect_crossover(ma_data)
-        momentum = self.calculate_momentum(data)
+        # Update indicators with the bars that are new since last cycle
+        engine = self.indicator_engines.get(name)
+        if engine is None:
+            engine = self.indicator_engines[name] = IndicatorEngine()
+        with metrics.timer('sensexy_stage_seconds', stage='indicators', symbol=name):
+            indicators = engine.update(data)
+        evaluation_started = time.perf_counter()
+        support = indicators['support']
+        resistance = indicators['resistance']
+        crossover = indicators['crossover']
+        momentum = indicators['momentum']
         
-        current_price = data['Close'].iloc[-1]
-        current_rsi = rsi.iloc[-1]
-        volume_surge = data['Volume'].iloc[-1] > data['Volume'].mean() * 1.5
+        current_price = indicators['close']
+        current_rsi = indicators['rsi']
+        volume_surge = indicators['volume'] > indicators['volume_mean'] * VOLUME_SURGE_FACTOR
         
         # Signal generation logic
         signal = {
@@ -108,61 +282,188 @@ class MarketAnalyzer:
         }
         
         # Strong BUY signal conditions
-        if current_rsi < RSI_OVERSOLD and (crossover == 'GOLDEN_CROSS' or momentum > 0.5):
+        if current_rsi < RSI_OVERSOLD and (crossover == 'GOLDEN_CROSS' or momentum > MOMENTUM_THRESHOLD):
             signal['type'] = 'BUY'
             signal['option_type'] = 'CALL'
             signal['confidence'] = 'HIGH'
             signal['reason'] = f"RSI oversold ({current_rsi:.1f}) + Bullish momentum"
         
         # Moderate BUY signal
-        elif current_rsi < 40 and current_price < support * 1.01:
+        elif current_rsi < RSI_BUY_BAND and current_price < support * 1.01:
             signal['type'] = 'BUY'
             signal['option_type'] = 'CALL'
             signal['confidence'] = 'MEDIUM'
             signal['reason'] = f"Near support level + RSI low ({current_rsi:.1f})"
         
         # Strong SELL signal conditions
-        elif current_rsi > RSI_OVERBOUGHT and (crossover == 'DEATH_CROSS' or momentum < -0.5):
+        elif current_rsi > RSI_OVERBOUGHT and (crossover == 'DEATH_CROSS' or momentum < -MOMENTUM_THRESHOLD):
             signal['type'] = 'SELL'
             signal['option_type'] = 'PUT'
             signal['confidence'] = 'HIGH'
             signal['reason'] = f"RSI overbought ({current_rsi:.1f}) + Bearish momentum"
         
         # Moderate SELL signal
-        elif current_rsi > 60 and current_price > resistance * 0.99:
+        elif current_rsi > RSI_SELL_BAND and current_price > resistance * 0.99:
             signal['type'] = 'SELL'
             signal['option_type'] = 'PUT'
             signal['confidence'] = 'MEDIUM'
             signal['reason'] = f"Near resistance level + RSI high ({current_rsi:.1f})"
         
         # Volume-based signal
-        elif volume_surge and abs(momentum) > 1:
+        elif volume_surge and abs(momentum) > VOLUME_MOMENTUM_THRESHOLD:
             signal['type'] = 'BUY' if momentum > 0 else 'SELL'
             signal['option_type'] = 'CALL' if momentum > 0 else 'PUT'
             signal['confidence'] = 'MEDIUM'
             signal['reason'] = f"Volume surge + {abs(momentum):.1f}% price move"
         else:
-            return None
+            signal = None
         
-        # Calculate strike price and targets
-        signal['strike_price'] = self.calculate_strike_price(current_price, 
-                                                            symbol_config['strike_step'])
-        signal['target_price'] = current_price * (1 + TARGET_PROFIT_PERCENT/100)
-        signal['stop_loss'] = current_price * (1 - STOP_LOSS_PERCENT/100)
+        if signal is not None and not self.trend_allows(name, signal['type'] == 'BUY'):
+            signal = None
+        metrics.observe('sensexy_stage_seconds', time.perf_counter() - evaluation_started,
+                        stage='signals', symbol=name)
+        if signal is None:
+            return None
+        return self.complete_signal(signal, symbol_config)
+    
+    def in_cooldown(self, name, current_time):
+        """Check if we recently sent a signal for a symbol"""
+        if name in self.last_signal_time:
+            time_diff = (current_time - self.last_signal_time[name]).seconds
+            if time_diff < 600:  # 10 minute cooldown
+                return True
+        return False
+    
+    def complete_signal(self, signal, symbol_config):
+        """Add the option to buy, its premium targets and lot size to a signal"""
+        current_price = signal['current_price']
+        atm_strike = self.calculate_strike_price(current_price, symbol_config['strike_step'])
+        vol = self.implied_volatility(symbol_config['ticker'])
+        ladder = OptionLadder(current_price, atm_strike, symbol_config['strike_step'],
+                              signal['timestamp'], vol,
+                              expiry_weekday=symbol_config.get('expiry_weekday', OPTION_EXPIRY_WEEKDAY))
+        signal.update(ladder.quote(signal['option_type']))
+        # The CALL or PUT is bought either way, so the target is always above entry
+        signal['target_price'] = signal['premium'] * (1 + OPTION_TARGET_PERCENT/100)
+        signal['stop_loss'] = signal['premium'] * (1 - OPTION_STOP_PERCENT/100)
         signal['lot_size'] = symbol_config['lot_size']
         
-        self.last_signal_time[name] = current_time
+        self.last_signal_time[signal['symbol']] = signal['timestamp']
         return signal
     
+    def implied_volatility(self, ticker, interval='5m'):
+        """Realized volatility of a symbol's cached bars, used as its implied volatility"""
+        data = self.market_data.get(ticker)
+        if data is None:
+            data = self.bar_cache.get(ticker, interval)
+        closes = data['Close'].to_numpy() if data is not None else []
+        return implied_volatility(closes, INTERVAL_MINUTES[interval])
+    
     def calculate_strike_price(self, current_price, strike_step):
         """Calculate nearest strike price"""
         return round(current_price / strike_step) * strike_step
     
     def analyze_all_symbols(self):
         """Analyze all configured symbols"""
+        market_data = self.refresh_data()
+        if ANALYSIS_MODE == 'panel':
+            return self.analyze_panel(market_data)
+        if ANALYSIS_MODE == 'sharded':
+            return self.analyze_sharded(market_data)
+        
         signals = []
         for symbol_name, symbol_config in SYMBOLS.items():
-            signal = self.generate_signal(symbol_config)
+            data = market_data.get(symbol_config['ticker'])
+            if data is None:
+                continue
+            signal = self.generate_signal(symbol_config, data)
             if signal:
                 signals.append(signal)
-        return signals
\ No newline at end of file
+        return signals
+    
+    def panel_frames(self, market_data):
+        """Bars of every configured symbol with enough history, by name"""
+        frames = {}
+        for symbol_name, symbol_config in SYMBOLS.items():
+            data = market_data.get(symbol_config['ticker'])
+            if data is not None and len(data) >= 50:
+                frames[symbol_config['name']] = data
+        return frames
+    
+    def analyze_panel(self, market_data):
+        """Analyze all configured symbols in one vectorized pass"""
+        current_time = datetime.now(self.ist)
+        frames = self.panel_frames(market_data)
+        if not frames:
+            return []
+        
+        with metrics.timer('sensexy_stage_seconds', stage='indicators', symbol='panel'):
+            panel = IndicatorPanel.from_frames(frames)
+            indicators = panel.compute()
+        with metrics.timer('sensexy_stage_seconds', stage='signals', symbol='panel'):
+            rules, directions = evaluate_signals(indicators)
+        
+        signals = []
+        symbol_configs = {symbol_config['name']: symbol_config for symbol_config in SYMBOLS.values()}
+        for row, name in enumerate(panel.names):
+            rule = rules[row, -1]
+            if rule == NO_SIGNAL or self.in_cooldown(name, current_time):
+                continue
+            if not self.trend_allows(name, directions[row, -1] > 0):
+                continue
+            signals.append(self.build_signal(symbol_configs[name], rule, directions[row, -1],
+                                             indicators['close'][row, -1],
+                                             indicators['rsi'][row, -1],
+                                             indicators['momentum'][row, -1], current_time))
+        return signals
+    
+    def analyze_sharded(self, market_data):
+        """Analyze a large universe on worker processes, strongest signals first"""
+        current_time = datetime.now(self.ist)
+        frames = self.panel_frames(market_data)
+        if self.scanner is None:
+            self.scanner = UniverseScanner()
+        with metrics.timer('sensexy_stage_seconds', stage='scan', symbol='sharded'):
+            hits = self.scanner.scan(frames)
+        
+        signals = []
+        symbol_configs = {symbol_config['name']: symbol_config for symbol_config in SYMBOLS.values()}
+        for name, rule, direction, close, rsi, momentum in sorted(hits, key=signal_priority):
+            if self.in_cooldown(name, current_time) or not self.trend_allows(name, direction > 0):
+                continue
+            signals.append(self.build_signal(symbol_configs[name], rule, direction, close, rsi,
+                                             momentum, current_time))
+        return signals
+    
+    def trend_allows(self, name, is_buy):
+        """Whether the higher timeframe trend agrees with a signal's direction"""
+        if not HTF_TREND_FILTER:
+            return True
+        ticker = SYMBOLS[name]['ticker'] if name in SYMBOLS else None
+        timeframes = self.timeframes.get(ticker)
+        if timeframes is None:
+            return True
+        resampler = timeframes.resamplers.get(HTF_TREND_INTERVAL)
+        data = resampler.frame if resampler else None
+        if data is None or len(data) < HTF_TREND_PERIOD:
+            return True
+        closes = data['Close'].to_numpy()
+        uptrend = closes[-1] > closes[-HTF_TREND_PERIOD:].mean()
+        return uptrend == is_buy
+    
+    def build_signal(self, symbol_config, rule, direction, close, rsi, momentum, current_time):
+        """Complete signal for a symbol whose latest bar triggered a cascade rule"""
+        confidence, reason = RULE_DESCRIPTIONS[rule]
+        is_buy = direction > 0
+        signal = {
+            'symbol': symbol_config['name'],
+            'current_price': close,
+            'rsi': rsi,
+            'momentum': momentum,
+            'timestamp': current_time,
+            'confidence': confidence,
+            'type': 'BUY' if is_buy else 'SELL',
+            'option_type': 'CALL' if is_buy else 'PUT',
+            'reason': reason.format(rsi=rsi, move=abs(momentum))
+        }
+        return self.complete_signal(signal, symbol_config)
@@ -0,0 +1,138 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import *
+from storage import write_atomic
+
+# Upper bounds in seconds, from a cached indicator update to a slow Yahoo call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    'sensexy_stage_seconds': 'Time spent in each stage of the bot',
+    'sensexy_telegram_seconds': 'Time spent in Telegram API calls',
+    'sensexy_signals_total': 'Signals sent',
+    'sensexy_confirmations_total': 'Confirmed signals turned into trades',
+    'sensexy_exits_total': 'Trades closed',
+    'sensexy_api_errors_total': 'Failed calls to external APIs'
+}
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram for one label set"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class Metrics:
+    """In-process counters and latency histograms in Prometheus text format
+    
+    Recording is a dict lookup and a bisect under a lock, so it is cheap
+    enough to leave on in every cycle.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+    
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter"""
+        key = label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+    
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a histogram"""
+        key = label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block into a histogram, whether or not it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def render(self):
+        """All series in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(key, [('le', bound)])} {cumulative}")
+                    cumulative += histogram.counts[-1]
+                    lines.append(f"{name}_bucket{format_labels(key, [('le', '+Inf')])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(key)} {histogram.total}")
+                    lines.append(f"{name}_count{format_labels(key)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+    
+    def write_file(self, path=METRICS_FILE):
+        """Write the current metrics for a node exporter textfile collector"""
+        write_atomic(path, self.render())
+    
+    def serve(self, port=METRICS_PORT, host='127.0.0.1'):
+        """Serve /metrics over HTTP from a daemon thread"""
+        registry = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+
+# Shared by every module so one endpoint shows the whole bot
+metrics = Metrics()
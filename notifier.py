@@ -1,32 +1,40 @@
-import requests
 import re
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 from config import *
+from metrics import metrics
+from telegram_delivery import DeliveryQueue, create_session
+from signal_store import PendingSignalStore
 
 class TelegramNotifier:
     def __init__(self, bot_token, chat_id):
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
-        self.ist = pytz.timezone('Asia/Kolkata')
-        self.pending_signals = {}
+        self.ist = ZoneInfo('Asia/Kolkata')
+        self.pending_signals = PendingSignalStore()
         self.last_update_id = None
+        self.poll_errors = 0
+        self.session = create_session()
+        # getUpdates long-polls on its own connection so it never holds up sends
+        self.poll_session = create_session()
+        self.delivery = DeliveryQueue(self.session, self.base_url)
+        self.commands = {}
         
     def send_message(self, message, parse_mode='HTML'):
-        """Send message to Telegram"""
-        try:
-            url = f"{self.base_url}/sendMessage"
-            payload = {
-                'chat_id': self.chat_id,
-                'text': message,
-                'parse_mode': parse_mode
-            }
-            response = requests.post(url, json=payload)
-            return response.json()
-        except Exception as e:
-            print(f"Error sending message: {e}")
-            return None
+        """Queue message for delivery to Telegram"""
+        payload = {
+            'chat_id': self.chat_id,
+            'text': message,
+            'parse_mode': parse_mode
+        }
+        return self.delivery.enqueue(payload)
+    
+    def close(self, timeout=10):
+        """Deliver queued messages and stop the sender"""
+        self.delivery.close(timeout)
+        self.session.close()
+        self.poll_session.close()
     
     def format_signal_message(self, signal):
         """Format signal message with emojis and structure"""
@@ -46,10 +54,12 @@ class TelegramNotifier:
 ━━━━━━━━━━━━━━━━━━━━━━
 📍 <b>Instrument:</b> {signal['symbol']} {signal['option_type']}
 💰 <b>Strike Price:</b> ₹{signal['strike_price']:,.0f}
+📅 <b>Expiry:</b> {signal['expiry'][:10]}
 📊 <b>Action:</b> {signal['type']}
-💵 <b>Current Price:</b> ₹{signal['current_price']:,.2f}
-🎯 <b>Target:</b> ₹{signal['target_price']:,.2f} ({TARGET_PROFIT_PERCENT}%)
-🛑 <b>Stop Loss:</b> ₹{signal['stop_loss']:,.2f} ({STOP_LOSS_PERCENT}%)
+📈 <b>Index:</b> ₹{signal['current_price']:,.2f}
+💵 <b>Premium:</b> ₹{signal['premium']:,.2f} (Δ {signal['delta']:+.2f}, IV {signal['implied_vol'] * 100:.1f}%)
+🎯 <b>Target:</b> ₹{signal['target_price']:,.2f} (+{OPTION_TARGET_PERCENT}%)
+🛑 <b>Stop Loss:</b> ₹{signal['stop_loss']:,.2f} (-{OPTION_STOP_PERCENT}%)
 📏 <b>Lot Size:</b> {signal['lot_size']}
 {confidence_emoji} <b>Confidence:</b> {signal['confidence']}
 📝 <b>Reason:</b> {signal.get('reason', 'Technical signal')}
@@ -66,6 +76,7 @@ class TelegramNotifier:
 🆔 <b>Trade ID:</b> {trade['id']}
 📍 <b>Symbol:</b> {trade['symbol']} {trade['option_type']}
 💰 <b>Strike:</b> ₹{trade['strike_price']:,.0f}
+📅 <b>Expiry:</b> {(trade.get('expiry') or '-')[:10]}
 📊 <b>Type:</b> {trade['type']}
 💵 <b>Entry:</b> ₹{trade['entry_price']:,.2f}
 🎯 <b>Target:</b> ₹{trade['target_price']:,.2f}
@@ -121,19 +132,17 @@ class TelegramNotifier:
         if not confirmed:
             return None
         
+        # Aliases match whole words only: with stock names in the universe a
+        # substring match would find symbols inside ordinary words
+        words = [word.strip('.,!?;:()[]"\'') for word in text_lower.split()]
+        
         # Parse symbol from response
-        parsed_symbol = None
-        for alias, symbol in SYMBOL_ALIASES.items():
-            if alias in text_lower:
-                parsed_symbol = symbol
-                break
+        parsed_symbol = next((SYMBOL_ALIASES[word] for word in words
+                              if word in SYMBOL_ALIASES), None)
         
         # Parse option type from response
-        parsed_option = None
-        for alias, option_type in OPTION_ALIASES.items():
-            if alias in text_lower:
-                parsed_option = option_type
-                break
+        parsed_option = next((OPTION_ALIASES[word] for word in words
+                              if word in OPTION_ALIASES), None)
         
         return {
             'confirmed': True,
@@ -142,15 +151,18 @@ class TelegramNotifier:
             'raw_text': text
         }
     
-    def get_updates(self):
-        """Get updates from Telegram"""
+    def get_updates(self, timeout=0):
+        """Get updates from Telegram, long-polling up to `timeout` seconds"""
         try:
             url = f"{self.base_url}/getUpdates"
-            params = {}
+            params = {'timeout': timeout}
             if self.last_update_id:
                 params['offset'] = self.last_update_id + 1
             
-            response = requests.get(url, params=params)
+            # Includes the long-poll wait when `timeout` is set
+            with metrics.timer('sensexy_telegram_seconds', method='getUpdates'):
+                response = self.poll_session.get(url, params=params,
+                                                 timeout=timeout + REQUEST_TIMEOUT)
             data = response.json()
             
             if data.get('ok') and data.get('result'):
@@ -160,33 +172,58 @@ class TelegramNotifier:
                 return updates
             return []
         except Exception as e:
+            metrics.inc('sensexy_api_errors_total', api='telegram')
             print(f"Error getting updates: {e}")
+            self.poll_errors += 1
             return []
     
-    def process_user_responses(self):
+    def add_command(self, name, handler):
+        """Handle /name messages from the bot's own chat with handler(args) -> reply"""
+        self.commands[name] = handler
+    
+    def handle_command(self, message):
+        """Run an admin command, returning True if the message was one"""
+        text = message['text'].strip()
+        if not text.startswith('/'):
+            return False
+        # Only the configured chat may control the bot
+        if str(message.get('chat', {}).get('id')) != str(self.chat_id):
+            return True
+        
+        parts = text[1:].split()
+        if not parts:
+            return False
+        name, args = parts[0], parts[1:]
+        handler = self.commands.get(name.split('@')[0].lower())
+        if handler is None:
+            self.send_message(f"❓ Unknown command /{name}")
+            return True
+        try:
+            reply = handler(args)
+        except Exception as e:
+            reply = f"⚠️ /{name} failed: {str(e)[:200]}"
+        if reply:
+            self.send_message(reply)
+        return True
+    
+    def process_user_responses(self, timeout=0):
         """Process user responses for pending signals"""
-        updates = self.get_updates()
+        updates = self.get_updates(timeout)
         confirmed_signals = []
         
         for update in updates:
             if 'message' in update and 'text' in update['message']:
+                if self.handle_command(update['message']):
+                    continue
                 user_text = update['message']['text']
                 user_response = self.parse_user_response(user_text)
                 
                 if user_response and user_response['confirmed']:
-                    # Find matching pending signal
-                    for signal_id, signal in list(self.pending_signals.items()):
-                        # Check if user specified a symbol or just confirmed
-                        if user_response['symbol']:
-                            if signal['symbol'] == user_response['symbol']:
-                                confirmed_signals.append(signal)
-                                del self.pending_signals[signal_id]
-                                break
-                        else:
-                            # No specific symbol mentioned, confirm the most recent signal
-                            confirmed_signals.append(signal)
-                            del self.pending_signals[signal_id]
-                            break
+                    # Match on whatever symbol and option type the user named
+                    signal = self.pending_signals.match(user_response['symbol'],
+                                                        user_response['option_type'])
+                    if signal:
+                        confirmed_signals.append(signal)
         
         return confirmed_signals
     
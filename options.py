@@ -0,0 +1,140 @@
+import math
+from datetime import datetime, timedelta
+import numpy as np
+from config import *
+
+YEAR_SECONDS = 365 * 24 * 3600
+TRADING_DAYS = 252
+SESSION_MINUTES = (MARKET_CLOSE_HOUR * 60 + MARKET_CLOSE_MINUTE) - (MARKET_OPEN_HOUR * 60 + MARKET_OPEN_MINUTE)
+
+
+def is_call(option_type):
+    """Whether an option type ('CALL', 'CE', 'PUT', 'PE', ...) is a call"""
+    return OPTION_ALIASES.get(str(option_type).lower(), option_type) == 'CALL'
+
+
+def norm_cdf(x):
+    """Standard normal CDF through the Abramowitz-Stegun erf approximation
+    
+    Absolute error is below 1.5e-7, well under a paisa on any premium.
+    """
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x) / math.sqrt(2)
+    t = 1 / (1 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741
+                + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-z * z)
+    return 0.5 * (1 + np.sign(x) * erf)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+
+def black_scholes(spot, strike, years, vol, call, rate=RISK_FREE_RATE):
+    """Premium, delta and theta (per calendar day) of European options
+    
+    Every argument broadcasts, so a whole ladder or a whole book of
+    positions is valued in one call. Options at or past expiry are worth
+    their intrinsic value.
+    """
+    spot, strike, years, vol, call = np.broadcast_arrays(
+        np.asarray(spot, dtype=float), np.asarray(strike, dtype=float),
+        np.asarray(years, dtype=float), np.asarray(vol, dtype=float),
+        np.asarray(call, dtype=bool))
+    live = years > 0
+    t = np.where(live, years, 1.0)
+    sigma = np.maximum(vol, 1e-6)
+    sigma_t = sigma * np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * sigma * sigma) * t) / sigma_t
+    d2 = d1 - sigma_t
+    n1, n2 = norm_cdf(d1), norm_cdf(d2)
+    discounted_strike = strike * np.exp(-rate * t)
+    
+    call_premium = spot * n1 - discounted_strike * n2
+    # Put-call parity saves a second pass through the CDF
+    premium = np.where(call, call_premium, call_premium - spot + discounted_strike)
+    delta = np.where(call, n1, n1 - 1)
+    decay = -spot * norm_pdf(d1) * sigma / (2 * np.sqrt(t))
+    carry = rate * discounted_strike * np.where(call, n2, n2 - 1)
+    theta = (decay - carry) / 365
+    
+    intrinsic = np.maximum(np.where(call, spot - strike, strike - spot), 0)
+    expired_delta = np.where(call, (spot > strike) * 1.0, (spot < strike) * -1.0)
+    premium = np.where(live, np.maximum(premium, 0), intrinsic)
+    delta = np.where(live, delta, expired_delta)
+    theta = np.where(live, theta, 0.0)
+    return premium, delta, theta
+
+
+def realized_volatility(closes, interval_minutes, window=VOLATILITY_WINDOW):
+    """Annualized volatility of the last `window` log returns, or None"""
+    closes = np.asarray(closes, dtype=float)[-(window + 1):]
+    closes = closes[~np.isnan(closes)]
+    if len(closes) < 3:
+        return None
+    returns = np.diff(np.log(closes))
+    bars_per_year = TRADING_DAYS * SESSION_MINUTES / interval_minutes
+    return float(np.std(returns, ddof=1) * math.sqrt(bars_per_year))
+
+
+def implied_volatility(closes, interval_minutes):
+    """Volatility to price options with, from realized volatility of recent bars"""
+    realized = realized_volatility(closes, interval_minutes)
+    if realized is None or not math.isfinite(realized):
+        return MIN_IMPLIED_VOL
+    return max(realized, MIN_IMPLIED_VOL)
+
+
+def expiry_dates(now, count=OPTION_LADDER_EXPIRIES, weekday=OPTION_EXPIRY_WEEKDAY):
+    """The next `count` weekly expiries, at market close
+    
+    An expiry closer than OPTION_MIN_EXPIRY_DAYS is skipped, since its
+    premium is mostly noise. Exchange holidays are not accounted for.
+    """
+    close = now.replace(hour=MARKET_CLOSE_HOUR, minute=MARKET_CLOSE_MINUTE, second=0, microsecond=0)
+    first = close + timedelta(days=(weekday - now.weekday()) % 7)
+    while first - now < timedelta(days=OPTION_MIN_EXPIRY_DAYS):
+        first += timedelta(weeks=1)
+    return [first + timedelta(weeks=week) for week in range(count)]
+
+
+def years_until(expiries, now):
+    """Time to each expiry in years; expiries are datetimes or epoch seconds"""
+    if isinstance(now, datetime):
+        now = now.timestamp()
+    seconds = [expiry.timestamp() if isinstance(expiry, datetime) else expiry for expiry in expiries]
+    return (np.asarray(seconds, dtype=float) - now) / YEAR_SECONDS
+
+
+class OptionLadder:
+    """Calls and puts for a ladder of strikes and expiries around spot
+    
+    premium, delta and theta are arrays shaped (call/put, expiry, strike),
+    all valued in a single black_scholes call.
+    """
+    
+    def __init__(self, spot, atm_strike, strike_step, now, vol, width=OPTION_LADDER_STRIKES,
+                 expiry_count=OPTION_LADDER_EXPIRIES, expiry_weekday=OPTION_EXPIRY_WEEKDAY):
+        self.spot = spot
+        self.vol = vol
+        self.width = width
+        self.strikes = atm_strike + strike_step * np.arange(-width, width + 1)
+        self.expiries = expiry_dates(now, expiry_count, expiry_weekday)
+        years = years_until(self.expiries, now)
+        self.premium, self.delta, self.theta = black_scholes(
+            spot, self.strikes[None, None, :], years[None, :, None], vol,
+            np.array([True, False])[:, None, None])
+    
+    def quote(self, option_type, expiry=0, strike=None):
+        """One option of the ladder, at the money on the nearest expiry by default"""
+        side = 0 if is_call(option_type) else 1
+        column = self.width if strike is None else int(np.argmin(np.abs(self.strikes - strike)))
+        return {
+            'strike_price': self.strikes[column].item(),
+            'expiry': self.expiries[expiry].isoformat(),
+            'premium': float(self.premium[side, expiry, column]),
+            'delta': float(self.delta[side, expiry, column]),
+            'theta': float(self.theta[side, expiry, column]),
+            'implied_vol': self.vol
+        }
@@ -0,0 +1,66 @@
+class PortfolioStats:
+    """Running aggregates over closed trades, updated as each one closes"""
+    
+    def __init__(self, closed_trades=()):
+        self.closed_count = 0
+        self.wins = 0
+        self.losses = 0
+        self.realized_pnl = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+        self.by_symbol = {}
+        for trade in closed_trades:
+            self.add(trade)
+    
+    def add(self, trade):
+        """Fold a closed trade into the aggregates"""
+        pnl = trade.get('pnl_amount', 0)
+        is_win = trade.get('pnl_percent', 0) > 0
+        is_loss = trade.get('pnl_percent', 0) < 0
+        
+        self.closed_count += 1
+        self.wins += is_win
+        self.losses += is_loss
+        if is_win:
+            self.gross_profit += pnl
+        elif is_loss:
+            self.gross_loss += pnl
+        
+        self.realized_pnl += pnl
+        self.peak_pnl = max(self.peak_pnl, self.realized_pnl)
+        self.max_drawdown = max(self.max_drawdown, self.peak_pnl - self.realized_pnl)
+        
+        symbol = self.by_symbol.setdefault(trade['symbol'], {
+            'closed_trades': 0, 'wins': 0, 'losses': 0, 'total_pnl': 0.0
+        })
+        symbol['closed_trades'] += 1
+        symbol['wins'] += is_win
+        symbol['losses'] += is_loss
+        symbol['total_pnl'] += pnl
+    
+    def win_rate(self):
+        return (self.wins / self.closed_count * 100) if self.closed_count > 0 else 0
+    
+    def summary(self):
+        """All aggregates as a plain dict"""
+        by_symbol = {}
+        for name, symbol in self.by_symbol.items():
+            by_symbol[name] = dict(symbol)
+            by_symbol[name]['win_rate'] = symbol['wins'] / symbol['closed_trades'] * 100
+        
+        return {
+            'closed_trades': self.closed_count,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': self.win_rate(),
+            'realized_pnl': self.realized_pnl,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'average_win': self.gross_profit / self.wins if self.wins else 0,
+            'average_loss': self.gross_loss / self.losses if self.losses else 0,
+            'profit_factor': (self.gross_profit / -self.gross_loss) if self.gross_loss else None,
+            'max_drawdown': self.max_drawdown,
+            'by_symbol': by_symbol
+        }
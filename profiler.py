@@ -0,0 +1,112 @@
+import cProfile
+import io
+import os
+import pstats
+import queue
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from config import *
+
+class CycleProfiler:
+    """Profiles the next few analysis cycles of a running bot on request
+    
+    request() only puts the request on a SimpleQueue, whose put() is
+    reentrant, and never takes a lock the running cycle could hold. It is
+    therefore safe to call from a signal handler or the Telegram listener
+    thread. The cycles themselves run under cProfile while tracemalloc
+    tracks allocations; when the last one finishes the stats and the
+    allocation diff are written to output_dir. Only the thread running the
+    cycles is profiled.
+    """
+    
+    def __init__(self, output_dir=PROFILE_DIR, default_cycles=PROFILE_CYCLES,
+                 max_cycles=PROFILE_MAX_CYCLES):
+        self.output_dir = output_dir
+        self.default_cycles = default_cycles
+        self.max_cycles = max_cycles
+        self.requests = queue.SimpleQueue()
+        self.remaining_cycles = 0
+        self.cycles = 0
+        self.profile = None
+        self.memory_start = None
+        self.started_tracing = False
+        self.last_report = None
+    
+    def request(self, cycles=None):
+        """Profile the next `cycles` cycles, unless a profile is already running
+        
+        Returns the number of cycles that will be profiled, capped at
+        max_cycles, or 0 if a profile is already running or requested.
+        """
+        if cycles is None:
+            cycles = self.default_cycles
+        if cycles < 1:
+            raise ValueError("cycles must be at least 1")
+        if self.remaining_cycles or not self.requests.empty():
+            return 0
+        cycles = min(cycles, self.max_cycles)
+        self.requests.put(cycles)
+        return cycles
+    
+    @contextmanager
+    def cycle(self):
+        """Wrap one analysis cycle, profiling it if a profile was requested"""
+        # Requests are only consumed here, on the thread running the cycles
+        requested = 0
+        while not self.requests.empty():
+            requested = requested or self.requests.get_nowait()
+        if requested and not self.remaining_cycles:
+            self.start(requested)
+        
+        if not self.remaining_cycles:
+            yield
+            return
+        
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+            self.remaining_cycles -= 1
+            if not self.remaining_cycles:
+                self.finish()
+    
+    def start(self, cycles):
+        self.profile = cProfile.Profile()
+        self.remaining_cycles = cycles
+        self.cycles = cycles
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.memory_start = tracemalloc.take_snapshot()
+    
+    def finish(self):
+        """Write the CPU profile and allocation diff, then stop tracing"""
+        memory_end = tracemalloc.take_snapshot()
+        if self.started_tracing:
+            tracemalloc.stop()
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(self.output_dir, f"cycles_{stamp}")
+        
+        # The .prof file loads in pstats, snakeviz and friends
+        self.profile.dump_stats(f"{base}.prof")
+        text = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=text)
+        stats.sort_stats('cumulative').print_stats(40)
+        with open(f"{base}.txt", 'w') as f:
+            f.write(f"{self.cycles} cycle(s)\n")
+            f.write(text.getvalue())
+        
+        differences = memory_end.compare_to(self.memory_start, 'lineno')
+        with open(f"{base}_memory.txt", 'w') as f:
+            f.write(f"Allocation change over {self.cycles} cycle(s), top 30 lines\n")
+            for difference in differences[:30]:
+                f.write(f"{difference}\n")
+        
+        self.profile = None
+        self.memory_start = None
+        self.last_report = base
+        print(f"Profile of {self.cycles} cycle(s) written to {base}.*")
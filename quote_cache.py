@@ -0,0 +1,42 @@
+import threading
+import time
+from config import *
+
+class QuoteCache:
+    """Last known good price per symbol, with when it was seen
+    
+    Stands in for symbols a fetch missed, but only while the price is at
+    most `max_age` seconds old, so exits are never judged on a price from
+    too long ago.
+    """
+    
+    def __init__(self, max_age=MAX_QUOTE_AGE):
+        self.max_age = max_age
+        self.quotes = {}
+        self.lock = threading.Lock()
+    
+    def update(self, prices):
+        """Remember freshly fetched prices"""
+        now = time.monotonic()
+        with self.lock:
+            for name, price in prices.items():
+                self.quotes[name] = (price, now)
+    
+    def fill(self, prices, names):
+        """Add cached prices for the names `prices` lacks, if recent enough"""
+        now = time.monotonic()
+        filled = dict(prices)
+        with self.lock:
+            for name in names:
+                if name in filled or name not in self.quotes:
+                    continue
+                price, seen_at = self.quotes[name]
+                if now - seen_at <= self.max_age:
+                    filled[name] = price
+        return filled
+    
+    def ages(self, names):
+        """Seconds since each of `names` had its price last fetched"""
+        now = time.monotonic()
+        with self.lock:
+            return {name: now - self.quotes[name][1] for name in names if name in self.quotes}
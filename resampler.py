@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from config import *
+from data_provider import INTERVAL_MINUTES
+
+class Resampler:
+    """Keeps one higher timeframe built incrementally from base bars
+    
+    Buckets are aligned to the market open (09:15, 09:20, ... for 5m and
+    09:15, 10:15, ... for 1h, as Yahoo labels them). Each update only
+    rebuilds the bucket that was still forming plus any new ones; closed
+    buckets are never recomputed.
+    """
+    
+    def __init__(self, interval, max_bars=BAR_CACHE_MAX_BARS):
+        self.interval = interval
+        minutes = INTERVAL_MINUTES[interval]
+        self.freq = f"{minutes}min"
+        self.offset = pd.Timedelta(minutes=(MARKET_OPEN_HOUR * 60 + MARKET_OPEN_MINUTE) % minutes)
+        self.max_bars = max_bars
+        self.frame = None
+    
+    def bucket_labels(self, index):
+        return (index - self.offset).floor(self.freq) + self.offset
+    
+    def aggregate(self, bars, labels):
+        """One bar per bucket from sorted base bars and their bucket labels"""
+        # Sorted bars put each bucket in one contiguous run
+        keys = labels.asi8
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        return pd.DataFrame({
+            'Open': bars['Open'].to_numpy(dtype=float)[starts],
+            'High': np.fmax.reduceat(bars['High'].to_numpy(dtype=float), starts),
+            'Low': np.fmin.reduceat(bars['Low'].to_numpy(dtype=float), starts),
+            'Close': bars['Close'].to_numpy(dtype=float)[ends - 1],
+            'Volume': np.add.reduceat(np.nan_to_num(bars['Volume'].to_numpy(dtype=float)), starts)
+        }, index=labels[starts])
+    
+    def update(self, base):
+        """Fold the latest base bars in and return the resampled frame"""
+        if base is None or base.empty:
+            return self.frame
+        
+        if self.frame is None or self.frame.empty or base.index[0] > self.frame.index[-1]:
+            # First build, or the base has moved past everything we had
+            labels = self.bucket_labels(base.index)
+            if base.index[0] != labels[0]:
+                # The base starts partway into its first bucket
+                complete = labels != labels[0]
+                base, labels = base[complete], labels[complete]
+            self.frame = self.aggregate(base, labels)
+        else:
+            forming_start = self.frame.index[-1]
+            recent = base.iloc[base.index.searchsorted(forming_start):]
+            if recent.empty:
+                return self.frame
+            rebuilt = self.aggregate(recent, self.bucket_labels(recent.index))
+            self.frame = pd.concat([self.frame.iloc[:-1], rebuilt])
+        
+        self.frame = self.frame.iloc[-self.max_bars:]
+        return self.frame
+
+
+class TimeframeSet:
+    """Every configured timeframe of one symbol, fed from its base bars"""
+    
+    def __init__(self, intervals=TIMEFRAMES, max_bars=BAR_CACHE_MAX_BARS):
+        self.resamplers = {interval: Resampler(interval, max_bars) for interval in intervals}
+    
+    def update(self, base):
+        """Bring every timeframe up to date, returning interval -> frame"""
+        return {interval: resampler.update(base) for interval, resampler in self.resamplers.items()}
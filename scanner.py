@@ -0,0 +1,119 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from config import *
+from indicator_panel import IndicatorPanel, evaluate_signals, NO_SIGNAL
+
+# Rows of the shared block
+CLOSE, HIGH, LOW, VOLUME = range(4)
+
+_attached = {}
+
+
+def attach(name):
+    """This worker's handle on a shared bar block, kept across cycles"""
+    block = _attached.get(name)
+    if block is None:
+        for stale in _attached.values():
+            stale.close()
+        _attached.clear()
+        block = _attached[name] = shared_memory.SharedMemory(name=name)
+    return block
+
+
+def scan_arrays(bars, min_bars=50):
+    """Signal rule and latest values for each symbol row of a (4, symbols, bars) array
+    
+    Returns (row, rule, direction, close, rsi, momentum) for rows whose
+    latest bar triggers a rule.
+    """
+    panel = IndicatorPanel(range(bars.shape[1]), bars[CLOSE], bars[HIGH], bars[LOW],
+                           bars[VOLUME], None)
+    indicators = panel.compute()
+    rules, directions = evaluate_signals(indicators, min_bars=min_bars)
+    hits = []
+    for row in np.flatnonzero(rules[:, -1] != NO_SIGNAL):
+        hits.append((int(row), int(rules[row, -1]), int(directions[row, -1]),
+                     float(indicators['close'][row, -1]), float(indicators['rsi'][row, -1]),
+                     float(indicators['momentum'][row, -1])))
+    return hits
+
+
+def scan_shard(block_name, shape, start, stop):
+    """Worker task: scan rows start:stop of the shared bar block"""
+    block = attach(block_name)
+    bars = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    hits = scan_arrays(bars[:, start:stop])
+    return [(start + row, *rest) for row, *rest in hits]
+
+
+class UniverseScanner:
+    """Evaluates the signal cascade for a large symbol universe on a process pool
+    
+    Bars are written once per cycle into a shared memory block laid out as
+    (close/high/low/volume, symbols, bars), right-aligned like
+    IndicatorPanel. Workers map the block and each scan a shard of rows,
+    so only shard bounds and the few triggered rows cross the process
+    boundary instead of pickled DataFrames.
+    """
+    
+    def __init__(self, workers=SCAN_WORKERS, shard_size=SCAN_SHARD_SIZE):
+        self.workers = workers
+        self.shard_size = shard_size
+        self.pool = None
+        self.block = None
+        self.shape = None
+    
+    def write_bars(self, frames):
+        """Copy every symbol's bars into the shared block"""
+        width = max(len(frame) for frame in frames.values())
+        shape = (4, len(frames), width)
+        if self.shape != shape:
+            self.release()
+            size = int(np.prod(shape)) * 8
+            self.block = shared_memory.SharedMemory(create=True, size=size)
+            self.shape = shape
+        bars = np.ndarray(shape, dtype=np.float64, buffer=self.block.buf)
+        bars.fill(np.nan)
+        for row, frame in enumerate(frames.values()):
+            start = width - len(frame)
+            for column, field in ((CLOSE, 'Close'), (HIGH, 'High'), (LOW, 'Low'), (VOLUME, 'Volume')):
+                bars[column, row, start:] = frame[field].to_numpy(dtype=float)
+        return bars
+    
+    def scan(self, frames):
+        """Triggered rows for a dict of name -> OHLCV frame, as (name, rule, direction, close, rsi, momentum)"""
+        if not frames:
+            return []
+        names = list(frames)
+        bars = self.write_bars(frames)
+        
+        if len(names) <= self.shard_size or self.workers <= 1:
+            # Not worth a round trip through the pool
+            hits = scan_arrays(bars)
+        else:
+            if self.pool is None:
+                # Spawned workers don't inherit the bot's threads and locks
+                self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            futures = [self.pool.submit(scan_shard, self.block.name, self.shape, start,
+                                        min(start + self.shard_size, len(names)))
+                       for start in range(0, len(names), self.shard_size)]
+            hits = [hit for future in futures for hit in future.result()]
+        del bars
+        return [(names[row], *rest) for row, *rest in hits]
+    
+    def release(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+            self.shape = None
+    
+    def close(self):
+        """Stop the workers and free the shared block"""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self.release()
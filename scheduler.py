@@ -0,0 +1,100 @@
+import threading
+import time
+from utils import MarketUtils
+
+class Job:
+    def __init__(self, name, func, interval, offset=0, market_hours_only=True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.offset = offset
+        self.market_hours_only = market_hours_only
+        self.next_run = None
+        self.skipped_runs = 0
+        self.thread = None
+
+
+class Scheduler:
+    """Runs jobs on fixed wall-clock grids instead of sleeping between them
+    
+    Each job's next run is the next slot on its grid (multiples of its
+    interval since midnight IST, plus an offset), not "interval after the
+    last run finished", so the cadence never drifts. A job that overran
+    one or more slots skips them rather than running them back to back.
+    
+    Background jobs get a thread of their own, so a slow job on the main
+    loop never holds up their cadence.
+    """
+    
+    def __init__(self, utils=None):
+        self.utils = utils or MarketUtils()
+        self.jobs = []
+        self.running = True
+    
+    def every(self, name, interval, func, offset=0, market_hours_only=True, background=False):
+        """Run a job every `interval` seconds, aligned to the clock"""
+        job = Job(name, func, interval, offset, market_hours_only)
+        job.next_run = self.utils.next_aligned_time(interval, offset)
+        if background:
+            job.thread = threading.Thread(target=self.run_background, args=(job,),
+                                          name=f"job-{name}", daemon=True)
+            job.thread.start()
+        else:
+            self.jobs.append(job)
+        return job
+    
+    def hourly(self, name, func, minute=0, market_hours_only=True):
+        """Run a job once an hour at an exact minute"""
+        return self.every(name, 3600, func, offset=minute * 60, market_hours_only=market_hours_only)
+    
+    def reset(self):
+        """Plan every job from now, e.g. after sitting out a market close"""
+        for job in self.jobs:
+            job.next_run = self.utils.next_aligned_time(job.interval, job.offset)
+    
+    def run_pending(self):
+        """Run every main loop job that is due"""
+        for job in self.jobs:
+            if self.utils.now() >= job.next_run:
+                self.run_job(job)
+    
+    def run_background(self, job):
+        """Loop of a background job on its own thread"""
+        while self.running:
+            wait = (job.next_run - self.utils.now()).total_seconds()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            self.run_job(job)
+    
+    def run_job(self, job):
+        """Run a due job, then plan its next slot"""
+        if not job.market_hours_only or self.utils.is_market_open():
+            try:
+                job.func()
+            except Exception as e:
+                print(f"Error in scheduled job {job.name}: {e}")
+        
+        # Next slot after now, counting the slots the run overran
+        planned = job.next_run
+        job.next_run = self.utils.next_aligned_time(job.interval, job.offset)
+        missed = int((job.next_run - planned).total_seconds() // job.interval) - 1
+        if missed > 0:
+            job.skipped_runs += missed
+            print(f"Job {job.name} skipped {missed} overrun slot(s)")
+    
+    def stop(self):
+        """Stop background jobs after their current run"""
+        self.running = False
+    
+    def seconds_until_next(self):
+        """Seconds until the earliest job is due"""
+        if not self.jobs:
+            return None
+        next_run = min(job.next_run for job in self.jobs)
+        return max((next_run - self.utils.now()).total_seconds(), 0)
+    
+    def sleep(self, max_seconds=60):
+        """Sleep until the next job is due, waking at least every `max_seconds`"""
+        wait = self.seconds_until_next()
+        time.sleep(max_seconds if wait is None else min(wait, max_seconds))
@@ -0,0 +1,76 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from config import *
+
+class PendingSignalStore:
+    """Signals awaiting confirmation, indexed for O(1) matching
+    
+    Signals are kept in arrival order, so expiry only ever looks at the
+    oldest entries. Each index maps a key to its signals in arrival order,
+    and a match takes the most recent one.
+    """
+    
+    def __init__(self, ttl=SIGNAL_TTL):
+        self.ttl = ttl
+        self.signals = OrderedDict()
+        self.indexes = {}
+        self.expired_count = 0
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        with self.lock:
+            self.expire()
+            return len(self.signals)
+    
+    def index_keys(self, signal):
+        symbol = signal['symbol']
+        option_type = signal.get('option_type')
+        return [None, ('symbol', symbol), ('option', option_type), ('pair', symbol, option_type)]
+    
+    def add(self, signal):
+        """Store a signal and return its unique id"""
+        signal_id = f"SIG_{datetime.now().strftime('%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with self.lock:
+            self.expire()
+            self.signals[signal_id] = (signal, time.monotonic())
+            for key in self.index_keys(signal):
+                self.indexes.setdefault(key, OrderedDict())[signal_id] = None
+        return signal_id
+    
+    def remove(self, signal_id):
+        signal, _ = self.signals.pop(signal_id)
+        for key in self.index_keys(signal):
+            index = self.indexes[key]
+            del index[signal_id]
+            if not index:
+                del self.indexes[key]
+        return signal
+    
+    def expire(self):
+        """Drop signals older than the TTL, their prices are stale"""
+        cutoff = time.monotonic() - self.ttl
+        while self.signals:
+            signal_id, (signal, created) = next(iter(self.signals.items()))
+            if created > cutoff:
+                break
+            self.remove(signal_id)
+            self.expired_count += 1
+    
+    def match(self, symbol=None, option_type=None):
+        """Take the most recent live signal matching a confirmation"""
+        # Aliases are matched as whole words, so a named option is meant and
+        # only signals of that option may be confirmed by the reply
+        if symbol:
+            key = ('pair', symbol, option_type) if option_type else ('symbol', symbol)
+        else:
+            key = ('option', option_type) if option_type else None
+        
+        with self.lock:
+            self.expire()
+            index = self.indexes.get(key)
+            if index:
+                return self.remove(next(reversed(index)))
+            return None
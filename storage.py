@@ -0,0 +1,161 @@
+import json
+import os
+from datetime import datetime
+from config import *
+
+def empty_portfolio():
+    return {'active_trades': {}, 'closed_trades': [], 'total_pnl': 0}
+
+
+def write_atomic(path, data):
+    """Write a file so readers see either the old or the new content"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    """Read a portfolio snapshot, setting aside a corrupt one"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return empty_portfolio()
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        backup = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        os.replace(path, backup)
+        print(f"Error loading portfolio, moved it to {backup}: {e}")
+        return empty_portfolio()
+
+
+def apply_event(portfolio, event):
+    """Replay one journal event onto a portfolio"""
+    kind = event['event']
+    data = event['data']
+    if kind == 'open':
+        portfolio['active_trades'][data['id']] = data
+    elif kind == 'prices':
+        for trade_id, fields in data.items():
+            if trade_id in portfolio['active_trades']:
+                portfolio['active_trades'][trade_id].update(fields)
+    elif kind == 'close':
+        trade = portfolio['active_trades'].pop(data['id'], None)
+        if trade is None:
+            return
+        trade.update(data)
+        if 'pnl_amount' in trade:
+            portfolio['total_pnl'] += trade['pnl_amount']
+        portfolio['closed_trades'].append(trade)
+
+
+class JsonPortfolioStore:
+    """Rewrites the whole portfolio file on every commit that has changes"""
+    
+    def __init__(self, path=PORTFOLIO_FILE):
+        self.path = path
+        self.changed = False
+    
+    def load(self):
+        return read_snapshot(self.path)
+    
+    def record(self, event, data):
+        # The whole portfolio is written, so only whether it changed matters
+        self.changed = True
+    
+    def commit(self, portfolio):
+        if not self.changed:
+            return
+        self.snapshot(portfolio)
+        self.changed = False
+    
+    def snapshot(self, portfolio):
+        """Write the full portfolio"""
+        write_atomic(self.path, json.dumps(portfolio, indent=2, default=str))
+
+
+class JournalPortfolioStore:
+    """Append-only event journal with periodic snapshots
+    
+    Each commit appends the events recorded since the last one in a single
+    fsynced write. Every SNAPSHOT_INTERVAL events the full portfolio is
+    written atomically and the journal is started over. Events carry a
+    sequence number so a crash between the two steps never replays an
+    event twice.
+    """
+    
+    def __init__(self, path=PORTFOLIO_FILE, journal_path=PORTFOLIO_JOURNAL_FILE,
+                 snapshot_interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.journal_path = journal_path
+        self.snapshot_interval = snapshot_interval
+        self.pending = []
+        self.sequence = 0
+        self.events_since_snapshot = 0
+    
+    def load(self):
+        portfolio = read_snapshot(self.path)
+        self.sequence = portfolio.get('journal_seq', 0)
+        self.events_since_snapshot = 0
+        
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb+') as f:
+                valid_length = 0
+                for line in f:
+                    try:
+                        # Every event is written with its newline, so a line
+                        # without one was cut short even if it parses
+                        if not line.endswith(b'\n'):
+                            raise ValueError("incomplete line")
+                        event = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append, cut it
+                        # off so the next append starts on a clean line
+                        f.truncate(valid_length)
+                        break
+                    valid_length += len(line)
+                    if event['seq'] <= self.sequence:
+                        continue
+                    apply_event(portfolio, event)
+                    self.sequence = event['seq']
+                    self.events_since_snapshot += 1
+        return portfolio
+    
+    def record(self, event, data):
+        self.sequence += 1
+        self.pending.append({'seq': self.sequence, 'event': event, 'data': data})
+    
+    def commit(self, portfolio):
+        if not self.pending:
+            return
+        lines = ''.join(json.dumps(event, default=str) + '\n' for event in self.pending)
+        with open(self.journal_path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.events_since_snapshot += len(self.pending)
+        self.pending = []
+        
+        if self.events_since_snapshot >= self.snapshot_interval:
+            self.snapshot(portfolio)
+    
+    def snapshot(self, portfolio):
+        """Write the full portfolio and start a fresh journal"""
+        portfolio['journal_seq'] = self.sequence
+        write_atomic(self.path, json.dumps(portfolio, indent=2, default=str))
+        with open(self.journal_path, 'w'):
+            pass
+        self.events_since_snapshot = 0
+
+
+PORTFOLIO_STORES = {
+    'json': JsonPortfolioStore,
+    'journal': JournalPortfolioStore
+}
+
+
+def create_portfolio_store(backend=PORTFOLIO_BACKEND):
+    """Create the configured portfolio persistence backend"""
+    return PORTFOLIO_STORES[backend]()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Grid search over strategy thresholds on stored historical bars.
+
+Indicators are computed once in the parent process and handed to each
+worker when it starts, so every combination only re-runs the signal
+cascade and the exit scan.
+"""
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config import *
+from backtest import Backtester, load_bars
+
+DEFAULT_GRID = {
+    'rsi_oversold': [25, 30, 35],
+    'rsi_overbought': [65, 70, 75],
+    'rsi_buy_band': [35, 40, 45],
+    'rsi_sell_band': [55, 60, 65],
+    'momentum_threshold': [0.3, 0.5],
+    'volume_surge_factor': [1.5, 2.0],
+    'volume_momentum_threshold': [0.5, 1.0],
+    'target_percent': [0.5, 1.0, 1.5],
+    'stop_percent': [0.3, 0.5, 1.0]
+}
+EXIT_PARAMS = ('target_percent', 'stop_percent')
+
+_backtester = None
+
+
+def init_worker(backtester):
+    """Keep the shared precomputed backtester for this worker's lifetime"""
+    global _backtester
+    _backtester = backtester
+
+
+def evaluate(combination):
+    """Backtest one parameter combination"""
+    signal_params = {key: value for key, value in combination.items() if key not in EXIT_PARAMS}
+    result = _backtester.run(signal_params,
+                             target_percent=combination.get('target_percent', TARGET_PROFIT_PERCENT),
+                             stop_percent=combination.get('stop_percent', STOP_LOSS_PERCENT))
+    trades = result['trades']
+    row = dict(combination)
+    row.update(result['summary'])
+    row['max_drawdown'] = max_drawdown(trades)
+    return row
+
+
+def max_drawdown(trades):
+    """Largest peak-to-trough fall of realised P&L"""
+    if trades.empty:
+        return 0.0
+    closed = trades[trades['status'] == 'CLOSED'].sort_values('exit_time')
+    equity = np.concatenate([[0.0], closed['pnl_amount'].cumsum().to_numpy()])
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def expand_grid(grid):
+    """All combinations of a parameter grid"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def run_sweep(frames, grid=None, workers=None, chunksize=16):
+    """Evaluate a parameter grid across a process pool, best first"""
+    combinations = expand_grid(grid or DEFAULT_GRID)
+    backtester = Backtester(frames)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(backtester,)) as pool:
+        rows = list(pool.map(evaluate, combinations, chunksize=chunksize))
+    results = pd.DataFrame(rows)
+    return results.sort_values(['total_pnl', 'win_rate'], ascending=False).reset_index(drop=True)
+
+
+def parse_grid(overrides):
+    """Apply key=v1,v2,... overrides to the default grid"""
+    grid = dict(DEFAULT_GRID)
+    for override in overrides:
+        key, _, values = override.partition('=')
+        if key not in grid:
+            raise SystemExit(f"Unknown parameter: {key}")
+        grid[key] = [float(value) for value in values.split(',')]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep Sensexy strategy thresholds')
+    parser.add_argument('data_dir', help='Directory with <SYMBOL>_<interval>.csv or <SYMBOL>.csv bar files')
+    parser.add_argument('--interval', default='5m', help='Bar interval of the recorded files')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=V1,V2',
+                        help='Replace the values swept for one parameter')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--top', type=int, default=20, help='Rows to print')
+    parser.add_argument('--output', help='Write the full ranked table to this CSV file')
+    args = parser.parse_args()
+    
+    frames = load_bars(args.data_dir, interval=args.interval)
+    if not frames:
+        print(f"❌ No bar files found in {args.data_dir}")
+        return
+    
+    grid = parse_grid(args.set)
+    results = run_sweep(frames, grid, workers=args.workers)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(results.head(args.top).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
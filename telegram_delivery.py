@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import *
+from metrics import metrics
+
+def create_session():
+    """HTTP session that keeps Telegram connections alive between calls"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+    session.mount('https://', adapter)
+    return session
+
+
+class DeliveryQueue:
+    """Sends Telegram messages from a background thread
+    
+    Callers only enqueue. The sender spaces messages to stay within
+    Telegram's per-chat and global rate limits and retries failures with
+    exponential backoff, honouring retry_after on HTTP 429.
+    """
+    
+    def __init__(self, session, base_url, chat_rate=TELEGRAM_CHAT_RATE,
+                 global_rate=TELEGRAM_GLOBAL_RATE, max_retries=TELEGRAM_MAX_RETRIES):
+        self.session = session
+        self.base_url = base_url
+        self.chat_interval = 1.0 / chat_rate
+        self.global_interval = 1.0 / global_rate
+        self.max_retries = max_retries
+        self.queue = queue.Queue()
+        self.chat_next_send = {}
+        self.global_next_send = 0.0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.thread = threading.Thread(target=self.run, name='telegram-sender', daemon=True)
+        self.thread.start()
+    
+    def enqueue(self, payload):
+        """Queue a sendMessage payload and return immediately"""
+        self.queue.put(payload)
+        return True
+    
+    def run(self):
+        while True:
+            payload = self.queue.get()
+            try:
+                if payload is None:
+                    return
+                self.deliver(payload)
+            finally:
+                self.queue.task_done()
+    
+    def wait_for_slot(self, chat_id):
+        """Sleep until both the chat and the bot may send again"""
+        now = time.monotonic()
+        delay = max(self.chat_next_send.get(chat_id, 0.0) - now, self.global_next_send - now, 0.0)
+        if delay:
+            time.sleep(delay)
+        sent_at = time.monotonic()
+        self.chat_next_send[chat_id] = sent_at + self.chat_interval
+        self.global_next_send = sent_at + self.global_interval
+    
+    def deliver(self, payload):
+        """Send one message, retrying with backoff"""
+        url = f"{self.base_url}/sendMessage"
+        backoff = 1.0
+        for attempt in range(self.max_retries + 1):
+            self.wait_for_slot(payload['chat_id'])
+            try:
+                with metrics.timer('sensexy_telegram_seconds', method='sendMessage'):
+                    response = self.session.post(url, json=payload, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200:
+                    self.sent_count += 1
+                    return response.json()
+                metrics.inc('sensexy_api_errors_total', api='telegram')
+                if response.status_code == 429:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', backoff)
+                    time.sleep(retry_after)
+                    continue
+                if response.status_code < 500:
+                    # Bad requests won't get better by retrying
+                    print(f"Error sending message: {response.status_code} {response.text[:200]}")
+                    break
+                print(f"Error sending message: {response.status_code}, retrying")
+            except Exception as e:
+                metrics.inc('sensexy_api_errors_total', api='telegram')
+                print(f"Error sending message: {e}")
+            time.sleep(backoff)
+            backoff *= 2
+        self.failed_count += 1
+        return None
+    
+    def flush(self, timeout=None):
+        """Wait for queued messages to go out, up to `timeout` seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def close(self, timeout=10):
+        """Deliver what is queued and stop the sender thread"""
+        self.flush(timeout)
+        self.queue.put(None)
+        self.thread.join(timeout=1)
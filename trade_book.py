@@ -0,0 +1,139 @@
+import time
+from datetime import datetime
+import numpy as np
+from config import *
+from options import black_scholes, is_call, YEAR_SECONDS
+
+EXIT_NONE = 0
+EXIT_TARGET = 1
+EXIT_STOP = 2
+EXIT_EXPIRED = 3
+
+
+def trade_side(trade):
+    """+1 when a trade gains as its price rises, -1 when it gains as it falls"""
+    # Option trades are long the premium whichever way the index is expected to go
+    if trade.get('expiry') or trade['type'] == 'BUY':
+        return 1
+    return -1
+
+
+class TradeBook:
+    """Columnar arrays over the active trades for vectorized exit checks
+    
+    The trade dicts stay the source of truth for everything else and are
+    reachable through `trades`, which is the portfolio's own active_trades
+    dict. Rows are kept in the same order as that dict.
+    
+    Option trades carry their strike, expiry and implied volatility so
+    the whole book can be revalued from index prices in one Black-Scholes
+    pass. Trades without an expiry are marked on the index price itself.
+    """
+    
+    def __init__(self, trades):
+        self.trades = trades
+        self.symbol_index = {name: index for index, name in enumerate(SYMBOLS)}
+        self.ids = []
+        self.entry = np.empty(0)
+        self.target = np.empty(0)
+        self.stop = np.empty(0)
+        self.side = np.empty(0)
+        self.quantity = np.empty(0)
+        self.symbol = np.empty(0, dtype=np.intp)
+        self.strike = np.empty(0)
+        self.expiry = np.empty(0)
+        self.vol = np.empty(0)
+        self.call = np.empty(0, dtype=bool)
+        for trade in trades.values():
+            self.append_row(trade)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def symbol_id(self, symbol):
+        if symbol not in self.symbol_index:
+            self.symbol_index[symbol] = len(self.symbol_index)
+        return self.symbol_index[symbol]
+    
+    def append_row(self, trade):
+        self.ids.append(trade['id'])
+        self.entry = np.append(self.entry, trade['entry_price'])
+        self.target = np.append(self.target, trade['target_price'])
+        self.stop = np.append(self.stop, trade['stop_loss'])
+        self.side = np.append(self.side, float(trade_side(trade)))
+        self.quantity = np.append(self.quantity, trade['quantity'])
+        self.symbol = np.append(self.symbol, self.symbol_id(trade['symbol']))
+        expiry = trade.get('expiry')
+        self.strike = np.append(self.strike, trade.get('strike_price') or np.nan)
+        self.expiry = np.append(self.expiry, datetime.fromisoformat(expiry).timestamp()
+                                if expiry else np.nan)
+        self.vol = np.append(self.vol, trade.get('implied_vol') or np.nan)
+        self.call = np.append(self.call, is_call(trade['option_type']))
+    
+    def add(self, trade):
+        """Add a new active trade"""
+        self.trades[trade['id']] = trade
+        self.append_row(trade)
+    
+    def remove(self, trade_id):
+        """Remove an active trade, returning its dict"""
+        row = self.ids.index(trade_id)
+        del self.ids[row]
+        self.entry = np.delete(self.entry, row)
+        self.target = np.delete(self.target, row)
+        self.stop = np.delete(self.stop, row)
+        self.side = np.delete(self.side, row)
+        self.quantity = np.delete(self.quantity, row)
+        self.symbol = np.delete(self.symbol, row)
+        self.strike = np.delete(self.strike, row)
+        self.expiry = np.delete(self.expiry, row)
+        self.vol = np.delete(self.vol, row)
+        self.call = np.delete(self.call, row)
+        return self.trades.pop(trade_id)
+    
+    def price_vector(self, current_prices):
+        """Prices per symbol index, NaN where a symbol has no price"""
+        prices = np.full(len(self.symbol_index), np.nan)
+        for symbol, price in current_prices.items():
+            if symbol in self.symbol_index:
+                prices[self.symbol_index[symbol]] = price
+        return prices
+    
+    def evaluate(self, current_prices, now=None):
+        """Mark every trade to market and decide exits in one step
+        
+        `current_prices` are index prices. Returns the rows that have one,
+        with that index price, the trade's own price (the option premium
+        for option trades), P&L percent, P&L amount and exit code. Options
+        past their expiry exit at intrinsic value.
+        """
+        now = time.time() if now is None else now
+        spots = self.price_vector(current_prices)[self.symbol]
+        priced = np.flatnonzero(~np.isnan(spots))
+        spots = spots[priced]
+        prices = self.revalue(priced, spots, now)
+        entry = self.entry[priced]
+        side = self.side[priced]
+        
+        pnl_percent = (side * (prices - entry) / entry) * 100
+        pnl_amount = (pnl_percent / 100) * entry * self.quantity[priced]
+        
+        # Signed distances: a BUY exits above target or below stop and a
+        # SELL the other way round
+        target_hit = side * (prices - self.target[priced]) >= 0
+        stop_hit = side * (prices - self.stop[priced]) <= 0
+        exits = np.where(target_hit, EXIT_TARGET, np.where(stop_hit, EXIT_STOP, EXIT_NONE))
+        # Settlement overrides the levels; NaN expiries never compare true
+        exits = np.where(self.expiry[priced] <= now, EXIT_EXPIRED, exits)
+        return priced, spots, prices, pnl_percent, pnl_amount, exits
+    
+    def revalue(self, rows, spots, now):
+        """Premiums of the option trades among `rows`, index prices for the rest"""
+        prices = spots.copy()
+        is_option = ~np.isnan(self.expiry[rows])
+        if is_option.any():
+            options = rows[is_option]
+            years = (self.expiry[options] - now) / YEAR_SECONDS
+            prices[is_option], _, _ = black_scholes(spots[is_option], self.strike[options], years,
+                                                    self.vol[options], self.call[options])
+        return prices
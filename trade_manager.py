@@ -1,145 +1,237 @@
-import json
-import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import uuid
-import pytz
+from zoneinfo import ZoneInfo
 from config import *
+from storage import create_portfolio_store
+from portfolio_stats import PortfolioStats
+from metrics import metrics
+from trade_book import TradeBook, EXIT_TARGET, EXIT_STOP, EXIT_EXPIRED, trade_side
 
 class TradeManager:
-    def __init__(self):
-        self.portfolio_file = 'portfolio.json'
-        self.ist = pytz.timezone('Asia/Kolkata')
+    def __init__(self, store=None):
+        self.store = store or create_portfolio_store()
+        self.ist = ZoneInfo('Asia/Kolkata')
+        self.transaction_depth = 0
+        # Mark-to-market updates not yet recorded in the store
+        self.unsaved_prices = {}
+        self.last_price_save = time.monotonic()
+        # Trades are created from the confirmation listener thread too
+        self.lock = threading.RLock()
         self.load_portfolio()
         
     def load_portfolio(self):
         """Load existing portfolio from file"""
-        if os.path.exists(self.portfolio_file):
-            try:
-                with open(self.portfolio_file, 'r') as f:
-                    self.portfolio = json.load(f)
-            except:
-                self.portfolio = {'active_trades': {}, 'closed_trades': [], 'total_pnl': 0}
-        else:
-            self.portfolio = {'active_trades': {}, 'closed_trades': [], 'total_pnl': 0}
+        self.portfolio = self.store.load()
+        self.stats = PortfolioStats(self.portfolio['closed_trades'])
+        self.book = TradeBook(self.portfolio['active_trades'])
     
     def save_portfolio(self):
         """Save portfolio to file"""
+        # Inside a transaction everything is saved once when it ends
+        if self.transaction_depth > 0:
+            return
         try:
-            with open(self.portfolio_file, 'w') as f:
-                json.dump(self.portfolio, f, indent=2, default=str)
+            with metrics.timer('sensexy_stage_seconds', stage='portfolio_save', symbol='all'):
+                self.store.commit(self.portfolio)
         except Exception as e:
             print(f"Error saving portfolio: {e}")
     
+    @contextmanager
+    def transaction(self):
+        """Group every change made inside the block into a single save"""
+        with self.lock:
+            self.transaction_depth += 1
+            try:
+                yield
+            finally:
+                self.transaction_depth -= 1
+                self.save_portfolio()
+    
     def create_trade(self, signal):
         """Create a new trade entry"""
-        if len(self.portfolio['active_trades']) >= MAX_TRADES:
-            return None, "Maximum trades limit reached"
-        
-        trade_id = f"TRADE_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
-        
-        trade = {
-            'id': trade_id,
-            'symbol': signal['symbol'],
-            'type': signal['type'],
-            'option_type': signal['option_type'],
-            'strike_price': signal['strike_price'],
-            'entry_price': signal['current_price'],
-            'target_price': signal['target_price'],
-            'stop_loss': signal['stop_loss'],
-            'lot_size': signal['lot_size'],
-            'quantity': signal['lot_size'],
-            'entry_time': datetime.now(self.ist).isoformat(),
-            'status': 'ACTIVE',
-            'reason': signal.get('reason', ''),
-            'confidence': signal.get('confidence', 'MEDIUM')
-        }
-        
-        self.portfolio['active_trades'][trade_id] = trade
-        self.save_portfolio()
+        with self.transaction():
+            if len(self.portfolio['active_trades']) >= MAX_TRADES:
+                return None, "Maximum trades limit reached"
+            
+            trade_id = f"TRADE_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+            
+            trade = {
+                'id': trade_id,
+                'symbol': signal['symbol'],
+                'type': signal['type'],
+                'option_type': signal['option_type'],
+                'strike_price': signal['strike_price'],
+                'expiry': signal.get('expiry'),
+                'implied_vol': signal.get('implied_vol'),
+                'underlying_entry': signal['current_price'],
+                # Option trades are entered, stopped and settled on the premium
+                'entry_price': signal.get('premium', signal['current_price']),
+                'target_price': signal['target_price'],
+                'stop_loss': signal['stop_loss'],
+                'lot_size': signal['lot_size'],
+                'quantity': signal['lot_size'],
+                'entry_time': datetime.now(self.ist).isoformat(),
+                'status': 'ACTIVE',
+                'reason': signal.get('reason', ''),
+                'confidence': signal.get('confidence', 'MEDIUM')
+            }
+            
+            self.book.add(trade)
+            self.store.record('open', dict(trade))
+            
+            return trade, None
+    
+    def update_trade_prices(self, current_prices, price_ages=None):
+        """Update current prices and check for exits
         
-        return trade, None
+        `price_ages` gives the age in seconds of prices that are not fresh.
+        """
+        with self.transaction():
+            return self.apply_prices(current_prices, price_ages)
     
-    def update_trade_prices(self, current_prices):
-        """Update current prices and check for exits"""
+    def apply_prices(self, current_prices, price_ages=None):
+        """Mark active trades to market and close those hitting an exit
+        
+        Prices are only recorded in the store when a trade closes or every
+        PRICE_PERSIST_INTERVAL seconds; in between they are kept in memory.
+        """
+        price_ages = price_ages or {}
         trades_to_close = []
+        price_updates = {}
         
-        for trade_id, trade in self.portfolio['active_trades'].items():
-            if trade['symbol'] in current_prices:
-                current_price = current_prices[trade['symbol']]
-                trade['current_price'] = current_price
-                
-                # Calculate P&L
-                if trade['type'] == 'BUY':
-                    pnl_percent = ((current_price - trade['entry_price']) / 
-                                  trade['entry_price']) * 100
-                else:  # SELL
-                    pnl_percent = ((trade['entry_price'] - current_price) / 
-                                  trade['entry_price']) * 100
-                
-                trade['pnl_percent'] = pnl_percent
-                trade['pnl_amount'] = (pnl_percent / 100) * trade['entry_price'] * trade['quantity']
-                
-                # Check exit conditions
-                if trade['type'] == 'BUY':
-                    if current_price >= trade['target_price']:
-                        trades_to_close.append((trade_id, 'TARGET_HIT', pnl_percent))
-                    elif current_price <= trade['stop_loss']:
-                        trades_to_close.append((trade_id, 'STOP_LOSS_HIT', pnl_percent))
-                else:  # SELL
-                    if current_price <= trade['target_price']:
-                        trades_to_close.append((trade_id, 'TARGET_HIT', pnl_percent))
-                    elif current_price >= trade['stop_loss']:
-                        trades_to_close.append((trade_id, 'STOP_LOSS_HIT', pnl_percent))
+        rows, spots, prices, pnl_percents, pnl_amounts, exits = self.book.evaluate(current_prices)
+        for row, underlying_price, current_price, pnl_percent, pnl_amount, exit_code in zip(
+                rows.tolist(), spots.tolist(), prices.tolist(), pnl_percents.tolist(),
+                pnl_amounts.tolist(), exits.tolist()):
+            trade_id = self.book.ids[row]
+            trade = self.portfolio['active_trades'][trade_id]
+            trade['underlying_price'] = underlying_price
+            trade['current_price'] = current_price
+            trade['pnl_percent'] = pnl_percent
+            trade['pnl_amount'] = pnl_amount
+            price_updates[trade_id] = {
+                'underlying_price': underlying_price,
+                'current_price': current_price,
+                'pnl_percent': pnl_percent,
+                'pnl_amount': pnl_amount
+            }
+            age = price_ages.get(trade['symbol'])
+            if age is not None:
+                trade['price_age'] = round(age, 1)
+                price_updates[trade_id]['price_age'] = trade['price_age']
+            elif trade.get('price_age') is not None:
+                # Fresh again, so the age of an earlier cached price no longer applies
+                trade['price_age'] = None
+                price_updates[trade_id]['price_age'] = None
+            
+            if exit_code == EXIT_TARGET:
+                trades_to_close.append((trade_id, 'TARGET_HIT', trade['target_price']))
+            elif exit_code == EXIT_STOP:
+                trades_to_close.append((trade_id, 'STOP_LOSS_HIT', trade['stop_loss']))
+            elif exit_code == EXIT_EXPIRED:
+                # Settled at the intrinsic value it was just marked at
+                trades_to_close.append((trade_id, 'EXPIRED', current_price))
+        
+        for trade_id, fields in price_updates.items():
+            self.unsaved_prices.setdefault(trade_id, {}).update(fields)
+        if time.monotonic() - self.last_price_save >= PRICE_PERSIST_INTERVAL:
+            self.record_prices()
         
         # Close trades that hit targets
         closed_trades = []
-        for trade_id, reason, pnl in trades_to_close:
-            closed_trade = self.close_trade(trade_id, reason)
+        for trade_id, reason, threshold in trades_to_close:
+            trade = self.portfolio['active_trades'][trade_id]
+            exit_details = self.exit_fill(trade, threshold)
+            if trade['symbol'] in price_ages:
+                exit_details['exit_price_age'] = trade['price_age']
+            closed_trade = self.close_trade(trade_id, reason, exit_details)
             if closed_trade:
                 closed_trades.append(closed_trade)
         
-        self.save_portfolio()
         return closed_trades
     
-    def close_trade(self, trade_id, reason='MANUAL'):
+    def record_prices(self):
+        """Record the mark-to-market updates kept in memory since the last save"""
+        with self.lock:
+            if self.unsaved_prices:
+                self.store.record('prices', self.unsaved_prices)
+                self.unsaved_prices = {}
+            self.last_price_save = time.monotonic()
+    
+    def save_prices(self):
+        """Save the latest prices of open trades, e.g. before shutting down"""
+        with self.transaction():
+            self.record_prices()
+    
+    def exit_fill(self, trade, threshold):
+        """Fill price and slippage of an exit against the level it crossed"""
+        fill_price = trade['current_price']
+        side = trade_side(trade)
+        # Positive slippage means the fill was worse than the threshold
+        slippage = side * (threshold - fill_price)
+        return {
+            'exit_price': fill_price,
+            'exit_threshold': threshold,
+            'exit_slippage': slippage,
+            # An option can expire worthless, leaving nothing to compare against
+            'exit_slippage_percent': slippage / threshold * 100 if threshold else 0.0
+        }
+    
+    def close_trade(self, trade_id, reason='MANUAL', exit_details=None):
         """Close an active trade"""
-        if trade_id not in self.portfolio['active_trades']:
-            return None
-        
-        trade = self.portfolio['active_trades'][trade_id]
-        trade['exit_time'] = datetime.now(self.ist).isoformat()
-        trade['exit_reason'] = reason
-        trade['status'] = 'CLOSED'
-        
-        # Calculate final P&L
-        if 'pnl_amount' in trade:
-            self.portfolio['total_pnl'] += trade['pnl_amount']
-        
-        # Move to closed trades
-        self.portfolio['closed_trades'].append(trade)
-        del self.portfolio['active_trades'][trade_id]
-        
-        self.save_portfolio()
-        return trade
+        with self.transaction():
+            if trade_id not in self.portfolio['active_trades']:
+                return None
+            
+            # A replayed close books the P&L of the last recorded prices
+            self.record_prices()
+            
+            trade = self.portfolio['active_trades'][trade_id]
+            changes = {
+                'id': trade_id,
+                'exit_time': datetime.now(self.ist).isoformat(),
+                'exit_reason': reason,
+                'status': 'CLOSED'
+            }
+            changes.update(exit_details or {})
+            trade.update(changes)
+            self.store.record('close', changes)
+            
+            # Calculate final P&L
+            if 'pnl_amount' in trade:
+                self.portfolio['total_pnl'] += trade['pnl_amount']
+            
+            # Move to closed trades
+            self.portfolio['closed_trades'].append(trade)
+            self.stats.add(trade)
+            self.book.remove(trade_id)
+            
+            return trade
     
     def get_active_trades(self):
         """Get all active trades"""
         return self.portfolio['active_trades']
     
+    def get_open_symbols(self):
+        """Get the symbols that have open positions"""
+        with self.lock:
+            return {trade['symbol'] for trade in self.portfolio['active_trades'].values()}
+    
     def get_portfolio_summary(self):
         """Get portfolio summary"""
-        active_count = len(self.portfolio['active_trades'])
-        total_pnl = self.portfolio['total_pnl']
-        closed_count = len(self.portfolio['closed_trades'])
-        
-        # Calculate win rate
-        winning_trades = [t for t in self.portfolio['closed_trades'] 
-                         if t.get('pnl_percent', 0) > 0]
-        win_rate = (len(winning_trades) / closed_count * 100) if closed_count > 0 else 0
-        
         return {
-            'active_trades': active_count,
-            'closed_trades': closed_count,
-            'total_pnl': total_pnl,
-            'win_rate': win_rate
-        }
\ No newline at end of file
+            'active_trades': len(self.portfolio['active_trades']),
+            'closed_trades': self.stats.closed_count,
+            'total_pnl': self.portfolio['total_pnl'],
+            'win_rate': self.stats.win_rate()
+        }
+    
+    def get_portfolio_stats(self):
+        """Get detailed performance statistics"""
+        stats = self.stats.summary()
+        stats['active_trades'] = len(self.portfolio['active_trades'])
+        stats['total_pnl'] = self.portfolio['total_pnl']
+        return stats
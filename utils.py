@@ -13,6 +13,17 @@ class MarketUtils:
     def __init__(self):
         self.ist = ZoneInfo("Asia/Kolkata")
     
+    def now(self):
+        return datetime.now(self.ist)
+    
+    def next_aligned_time(self, interval, offset=0):
+        """Next time strictly after now on a grid of `interval` seconds from midnight IST"""
+        now = self.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - midnight).total_seconds() - offset
+        slots = int(elapsed // interval) + 1
+        return midnight + timedelta(seconds=slots * interval + offset)
+    
     def is_market_open(self):
         now = datetime.now(self.ist)
 